@@ -0,0 +1,132 @@
+"""
+Artifact Load Benchmark
+Compares cold load time and resident memory of forest models stored as plain
+pickles, uncompressed joblib (mmap_mode) and packed forests (mmap_mode)
+
+Usage (from the repository root, after training):
+    python ai-engine/benchmarks/bench_artifacts.py [--repeat 5] [--json out.json]
+"""
+
+import os
+import sys
+import json
+import pickle
+import argparse
+import subprocess
+import tempfile
+import statistics
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts')
+sys.path.insert(0, SCRIPTS_DIR)
+
+MODELS = ['random_forest', 'fraud_classifier', 'isolation_forest', 'anomaly_model']
+
+# Runs in a fresh interpreter so every load is cold for the process
+CHILD = r'''
+import sys, json, time
+sys.path.insert(0, {scripts!r})
+import numpy, sklearn.ensemble, joblib, pickle
+from packed_forest import load_packed_forest
+
+def memory():
+    fields = {{}}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('VmRSS', 'RssAnon', 'RssFile'):
+                    fields[key] = int(value.split()[0])
+    except OSError:
+        import resource
+        fields['VmRSS'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return fields
+
+fmt, path, n_features = {fmt!r}, {path!r}, {n_features!r}
+before = memory()
+start = time.perf_counter()
+if fmt == 'pickle':
+    with open(path, 'rb') as f:
+        model = pickle.load(f)
+elif fmt == 'joblib-mmap':
+    model = joblib.load(path, mmap_mode='c')
+else:
+    model = load_packed_forest(path)
+load_seconds = time.perf_counter() - start
+loaded = memory()
+
+# One scoring call so lazily mapped pages are touched
+X = numpy.zeros((1, n_features))
+model.predict(X)
+scored = memory()
+
+print(json.dumps({{
+    'load_seconds': load_seconds,
+    'rss_kb': loaded.get('VmRSS', 0) - before.get('VmRSS', 0),
+    'private_kb': scored.get('RssAnon', 0) - before.get('RssAnon', 0),
+    'shared_file_kb': scored.get('RssFile', 0) - before.get('RssFile', 0),
+}}))
+'''
+
+def measure(fmt, path, n_features, repeat):
+    runs = []
+    for _ in range(repeat):
+        code = CHILD.format(scripts=SCRIPTS_DIR, fmt=fmt, path=path, n_features=n_features)
+        output = subprocess.run([sys.executable, '-W', 'ignore', '-c', code],
+                                check=True, capture_output=True, text=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        'load_ms_median': statistics.median(run['load_seconds'] for run in runs) * 1000,
+        'rss_kb_median': statistics.median(run['rss_kb'] for run in runs),
+        'private_kb_median': statistics.median(run['private_kb'] for run in runs),
+        'shared_file_kb_median': statistics.median(run['shared_file_kb'] for run in runs),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark model artifact load time and memory")
+    parser.add_argument('--models-dir', default='ai-engine/models')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    import joblib
+    from packed_forest import save_packed_forest
+    from model_registry import registry
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name in MODELS:
+            # The published model version when the default models dir is used
+            source = registry.resolve(os.path.join(args.models_dir, name + '.pkl'))
+            if not os.path.exists(source):
+                print(f"- {name}: not trained, skipped")
+                continue
+            model = joblib.load(source)
+
+            # Write each format fresh so the comparison uses the same model
+            paths = {
+                'pickle': os.path.join(tmp_dir, name + '.pickle'),
+                'joblib-mmap': os.path.join(tmp_dir, name + '.joblib'),
+                'packed-mmap': os.path.join(tmp_dir, name + '.packed'),
+            }
+            with open(paths['pickle'], 'wb') as f:
+                pickle.dump(model, f)
+            joblib.dump(model, paths['joblib-mmap'], compress=0)
+            save_packed_forest(model, paths['packed-mmap'])
+
+            results[name] = {
+                fmt: measure(fmt, path, model.n_features_in_, args.repeat)
+                for fmt, path in paths.items()
+            }
+
+    print(f"{'model':<18}{'format':<14}{'load ms':>10}{'RSS KB':>10}{'private KB':>12}{'shared KB':>11}")
+    for name, formats in results.items():
+        for fmt, row in formats.items():
+            print(f"{name:<18}{fmt:<14}{row['load_ms_median']:>10.2f}{row['rss_kb_median']:>10.0f}"
+                  f"{row['private_kb_median']:>12.0f}{row['shared_file_kb_median']:>11.0f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
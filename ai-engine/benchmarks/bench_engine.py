@@ -0,0 +1,332 @@
+"""
+AI Engine Benchmark Suite
+Measures cold and warm latency percentiles and batch throughput for every
+ai-engine entry point, saves them as JSON with machine info, and compares a
+run against a stored baseline
+
+Usage (from the repository root, after training):
+    python ai-engine/benchmarks/bench_engine.py run [--json results.json] [--sizes 1 100 10000]
+    python ai-engine/benchmarks/bench_engine.py compare baseline.json results.json [--threshold 0.25]
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+import statistics
+from datetime import datetime, timezone
+
+import numpy as np
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts')
+sys.path.insert(0, SCRIPTS_DIR)
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000, 100000, 1000000]
+
+# Entry points without a batch API are timed row by row up to this many rows
+LOOP_MAX_ROWS = 100000
+
+# Small batches are repeated until this much time has passed, to steady the rate
+MIN_SECONDS = 0.2
+
+# Columns of the generated input rows, with (low, high) uniform ranges
+COLUMNS = {
+    'demand': (100, 1000),
+    'quantity': (500, 2000),
+    'delay_days': (0, 10),
+    'temperature': (5, 45),
+    'stock_level': (0, 1500),
+    'anomaly_score': (0, 100),
+    'delay_factor': (0, 100),
+    'trust_score': (0, 100),
+    'demand_volatility': (0, 100),
+}
+
+def _report_input(row):
+    return {
+        'demand_forecast': {'growth_percentage': row['demand'] / 50 - 10, 'confidence': 85.0},
+        'anomaly_status': {'anomaly': row['temperature'] > 35, 'score': -row['temperature'] / 100},
+        'risk_level': 'HIGH' if row['delay_days'] > 7 else 'MEDIUM' if row['delay_days'] > 3 else 'LOW',
+        'risk_probability': row['delay_days'] / 10,
+        'top_factors': ['delay_days', 'temperature', 'demand']
+    }
+
+# 'single' scores one row dict; 'batch' (optional) scores a DataFrame of rows
+ENTRY_POINTS = {
+    'forecast_demand': {
+        'module': 'predict',
+        'single': lambda mod, row: mod.forecast_demand(30),
+    },
+    'detect_anomaly_zscore': {
+        'module': 'predict',
+        'single': lambda mod, row: mod.detect_anomaly(row['temperature'], row['quantity'], row['delay_days']),
+    },
+    'detect_anomaly_model': {
+        'module': 'anomaly_detection',
+        'single': lambda mod, row: mod.detect_anomaly(row),
+        'batch': lambda mod, frame: mod.detect_anomalies(frame),
+    },
+    'predict_risk': {
+        'module': 'risk_forecasting',
+        'single': lambda mod, row: mod.predict_risk(row),
+        'batch': lambda mod, frame: mod.predict_risk_batch(frame[mod.FEATURES].to_numpy(), output='numpy'),
+    },
+    'calculate_fraud_risk': {
+        'module': 'predict',
+        'single': lambda mod, row: mod.calculate_fraud_risk(row['anomaly_score'], row['delay_factor'], row['trust_score']),
+        'batch': lambda mod, frame: mod.calculate_fraud_risk_batch(frame['anomaly_score'], frame['delay_factor'],
+                                                                   frame['trust_score'], output='numpy'),
+    },
+    'calculate_scri': {
+        'module': 'predict',
+        'single': lambda mod, row: mod.calculate_scri(row['anomaly_score'], row['delay_factor'],
+                                                      row['temperature'], row['demand_volatility']),
+        'batch': lambda mod, frame: mod.calculate_scri_batch(frame['anomaly_score'], frame['delay_factor'],
+                                                             frame['temperature'], frame['demand_volatility']),
+    },
+    'generate_insight_report': {
+        'module': 'insight_generator',
+        'single': lambda mod, row: mod.generate_insight_report(_report_input(row)),
+    },
+}
+
+def sample_matrix(n_rows, seed=42):
+    """Uniform random rows over COLUMNS, as an (n_rows, len(COLUMNS)) array"""
+    rng = np.random.default_rng(seed)
+    low = np.array([bounds[0] for bounds in COLUMNS.values()], dtype=np.float64)
+    high = np.array([bounds[1] for bounds in COLUMNS.values()], dtype=np.float64)
+    return low + rng.random((n_rows, len(COLUMNS))) * (high - low)
+
+def sample_rows(n_rows, seed=42):
+    names = list(COLUMNS)
+    return [dict(zip(names, values)) for values in sample_matrix(n_rows, seed).tolist()]
+
+def machine_info():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'git_commit': commit
+    }
+
+# Cold runs
+
+def cold_child(name):
+    """Import and first call in this (fresh) process; prints one JSON line"""
+    start = time.perf_counter()
+    import importlib
+    spec = ENTRY_POINTS[name]
+    module = importlib.import_module(spec['module'])
+    imported = time.perf_counter()
+    spec['single'](module, sample_rows(1)[0])
+    called = time.perf_counter()
+    print(json.dumps({
+        'import_ms': (imported - start) * 1000,
+        'first_call_ms': (called - imported) * 1000,
+    }))
+
+def measure_cold(name, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-W', 'ignore', os.path.abspath(__file__), 'cold', name],
+                                check=True, capture_output=True, text=True).stdout
+        process_ms = (time.perf_counter() - start) * 1000
+        sample = json.loads(output.strip().splitlines()[-1])
+        sample['process_ms'] = process_ms
+        samples.append(sample)
+    return {key: statistics.median(sample[key] for sample in samples)
+            for key in ('import_ms', 'first_call_ms', 'process_ms')}
+
+# Warm runs
+
+def measure_warm(module, spec, iterations):
+    """Per-call latency percentiles once models and caches are loaded"""
+    rows = sample_rows(iterations, seed=7)
+    call = spec['single']
+    call(module, rows[0])
+    timings = np.empty(iterations)
+    for index, row in enumerate(rows):
+        start = time.perf_counter()
+        call(module, row)
+        timings[index] = time.perf_counter() - start
+    p50, p95, p99 = np.percentile(timings * 1e6, [50, 95, 99])
+    return {'p50_us': float(p50), 'p95_us': float(p95), 'p99_us': float(p99),
+            'mean_us': float(timings.mean() * 1e6), 'iterations': iterations}
+
+def _timed_repeats(work):
+    """Run work until MIN_SECONDS have passed; returns (repeats, seconds)"""
+    repeats = 0
+    start = time.perf_counter()
+    while True:
+        work()
+        repeats += 1
+        seconds = time.perf_counter() - start
+        if seconds >= MIN_SECONDS:
+            return repeats, seconds
+
+def measure_throughput(module, spec, sizes, loop_max):
+    import pandas as pd
+    results = {}
+    for size in sizes:
+        if 'batch' in spec:
+            frame = pd.DataFrame(sample_matrix(size), columns=list(COLUMNS))
+            spec['batch'](module, frame.iloc[:1])
+            rows, mode = size, 'batch'
+            repeats, seconds = _timed_repeats(lambda: spec['batch'](module, frame))
+        else:
+            rows, mode = min(size, loop_max), 'loop'
+            inputs = sample_rows(rows)
+            call = spec['single']
+            
+            def work():
+                for row in inputs:
+                    call(module, row)
+            repeats, seconds = _timed_repeats(work)
+        results[str(size)] = {
+            'rows': rows,
+            'mode': mode,
+            'repeats': repeats,
+            'seconds': seconds,
+            'rows_per_second': rows * repeats / seconds
+        }
+    return results
+
+def run(args):
+    import importlib
+    results = {}
+    for name in args.only or ENTRY_POINTS:
+        spec = ENTRY_POINTS[name]
+        print(f"Benchmarking {name}...", file=sys.stderr)
+        module = importlib.import_module(spec['module'])
+        results[name] = {
+            'cold': measure_cold(name, args.cold_runs),
+            'warm': measure_warm(module, spec, args.iterations),
+            'throughput': measure_throughput(module, spec, args.sizes, args.loop_max)
+        }
+
+    report = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'machine': machine_info(),
+        'settings': {'iterations': args.iterations, 'cold_runs': args.cold_runs,
+                     'sizes': args.sizes, 'loop_max': args.loop_max},
+        'results': results
+    }
+
+    print(f"{'entry point':<26}{'cold ms':>10}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}  throughput (rows/s)")
+    for name, result in results.items():
+        cold, warm = result['cold'], result['warm']
+        throughput = ", ".join(f"{size}: {row['rows_per_second']:,.0f}" for size, row in result['throughput'].items())
+        print(f"{name:<26}{cold['process_ms']:>10.1f}{warm['p50_us']:>10.1f}{warm['p95_us']:>10.1f}"
+              f"{warm['p99_us']:>10.1f}  {throughput}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Results saved to {args.json}")
+    return report
+
+# Baseline comparison
+
+def flatten_metrics(report):
+    """
+    Map 'entry/metric' to (value, higher_is_better) for every comparable number
+    """
+    metrics = {}
+    for name, result in report['results'].items():
+        for key in ('import_ms', 'first_call_ms', 'process_ms'):
+            metrics[f"{name}/cold.{key}"] = (result['cold'][key], False)
+        for key in ('p50_us', 'p95_us', 'p99_us'):
+            metrics[f"{name}/warm.{key}"] = (result['warm'][key], False)
+        for size, row in result['throughput'].items():
+            metrics[f"{name}/throughput.{size}"] = (row['rows_per_second'], True)
+    return metrics
+
+def compare(args):
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    with open(args.current, 'r') as f:
+        current = json.load(f)
+
+    if baseline.get('machine') != current.get('machine'):
+        changed = sorted(key for key in set(baseline.get('machine', {})) | set(current.get('machine', {}))
+                         if baseline.get('machine', {}).get(key) != current.get('machine', {}).get(key)
+                         and key != 'git_commit')
+        if changed:
+            print(f"! Machine info differs ({', '.join(changed)}); numbers may not be comparable")
+
+    base_metrics, current_metrics = flatten_metrics(baseline), flatten_metrics(current)
+    regressions, improvements = [], []
+    for key in sorted(set(base_metrics) & set(current_metrics)):
+        base_value, higher_is_better = base_metrics[key]
+        value = current_metrics[key][0]
+        if not base_value or not value:
+            continue
+        # Ratio > 1 always means "worse", whichever direction the metric runs
+        ratio = base_value / value if higher_is_better else value / base_value
+        if ratio > 1 + args.threshold:
+            regressions.append((key, base_value, value, ratio))
+        elif ratio < 1 / (1 + args.threshold):
+            improvements.append((key, base_value, value, ratio))
+
+    for title, rows in (("Regressions", regressions), ("Improvements", improvements)):
+        if rows:
+            print(f"{title}:")
+            for key, base_value, value, ratio in rows:
+                print(f"  {key:<48}{base_value:>14.2f} -> {value:<14.2f} ({ratio:.2f}x worse)" if ratio > 1 else
+                      f"  {key:<48}{base_value:>14.2f} -> {value:<14.2f} ({1 / ratio:.2f}x better)")
+
+    missing = sorted(set(base_metrics) - set(current_metrics))
+    if missing:
+        print(f"! {len(missing)} baseline metrics missing from the current run")
+
+    if regressions:
+        print(f"✗ {len(regressions)} regressions beyond {args.threshold:.0%}")
+        sys.exit(1)
+    print(f"✓ No regressions beyond {args.threshold:.0%}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ai-engine entry points")
+    commands = parser.add_subparsers(dest='command')
+
+    run_parser = commands.add_parser('run', help="Run the benchmarks")
+    run_parser.add_argument('--json', help="Write results to this JSON file")
+    run_parser.add_argument('--only', nargs='+', choices=sorted(ENTRY_POINTS), help="Benchmark only these entry points")
+    run_parser.add_argument('--sizes', nargs='+', type=int, default=BATCH_SIZES)
+    run_parser.add_argument('--iterations', type=int, default=1000, help="Warm calls per entry point")
+    run_parser.add_argument('--cold-runs', type=int, default=3, help="Fresh processes per entry point")
+    run_parser.add_argument('--loop-max', type=int, default=LOOP_MAX_ROWS,
+                            help="Row cap for entry points without a batch API")
+
+    compare_parser = commands.add_parser('compare', help="Flag regressions against a baseline")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.25,
+                                help="Allowed slowdown before a metric counts as a regression")
+
+    # Internal: one cold measurement in a fresh interpreter
+    cold_parser = commands.add_parser('cold')
+    cold_parser.add_argument('name', choices=sorted(ENTRY_POINTS))
+
+    args = parser.parse_args()
+    if args.command == 'compare':
+        compare(args)
+    elif args.command == 'cold':
+        cold_child(args.name)
+    elif args.command == 'run':
+        run(args)
+    else:
+        parser.print_help()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Startup Time Benchmark
+Runs each CLI action in a fresh interpreter under `python -X importtime` and
+fails when its import time or wall time exceeds the action's budget, or when
+it imports a module that its scoring path should not need
+
+Usage (from the repository root, after training):
+    python ai-engine/benchmarks/bench_startup.py [--repeat 3] [--scale 1.0] [--json out.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import statistics
+
+SCRIPTS_DIR = os.path.join('ai-engine', 'scripts')
+
+SAMPLE = {'demand': 500, 'quantity': 1000, 'delay_days': 2, 'temperature': 25, 'stock_level': 800}
+
+REPORT_INPUT = {
+    'demand_forecast': {'growth_percentage': 12.5, 'confidence': 85},
+    'anomaly_status': {'anomaly': False, 'score': -0.15},
+    'risk_level': 'MEDIUM', 'risk_probability': 0.55, 'top_factors': ['delay_days', 'temperature', 'demand']
+}
+
+LEDGER_CSV = ("anomaly_score,delay_factor,trust_score,delay_score,temp_anomaly,demand_volatility\n"
+              "40,20,70,30,10,25\n65,80,20,75,60,50\n")
+
+# Budgets in milliseconds, with headroom over a warm page cache on a laptop.
+# 'forbidden' lists top-level packages the action must not import at all;
+# 'stdin' is optional input piped to the action.
+ACTIONS = {
+    'forecast': {
+        'argv': ['predict.py', 'forecast'],
+        'import_ms': 400, 'wall_ms': 1000,
+        'forbidden': ['pandas', 'sklearn', 'statsmodels', 'joblib']
+    },
+    'anomaly-zscore': {
+        'argv': ['predict.py', 'anomaly', '25', '1000', '2'],
+        'import_ms': 400, 'wall_ms': 800,
+        'forbidden': ['pandas', 'sklearn', 'statsmodels', 'joblib']
+    },
+    'anomaly': {
+        'argv': ['anomaly_detection.py', json.dumps(SAMPLE)],
+        'import_ms': 400, 'wall_ms': 1000,
+        'forbidden': ['pandas', 'sklearn', 'statsmodels', 'joblib']
+    },
+    'risk': {
+        'argv': ['risk_forecasting.py', json.dumps(SAMPLE)],
+        'import_ms': 400, 'wall_ms': 1000,
+        'forbidden': ['pandas', 'sklearn', 'statsmodels', 'joblib']
+    },
+    'report': {
+        'argv': ['report_pipeline.py', json.dumps(SAMPLE)],
+        'import_ms': 500, 'wall_ms': 1200,
+        'forbidden': ['pandas', 'sklearn', 'statsmodels', 'joblib']
+    },
+    'fraud': {
+        'argv': ['predict.py', 'fraud', '40', '20', '70'],
+        'import_ms': 400, 'wall_ms': 800,
+        'forbidden': ['pandas', 'sklearn', 'statsmodels', 'joblib']
+    },
+    'scri': {
+        'argv': ['predict.py', 'scri', '40', '30', '10', '25'],
+        'import_ms': 400, 'wall_ms': 800,
+        'forbidden': ['pandas', 'sklearn', 'statsmodels', 'joblib']
+    },
+    # Bulk scoring reads the ledger with pandas; the models stay unloaded
+    'ledger': {
+        'argv': ['predict.py', 'ledger', '-'],
+        'stdin': LEDGER_CSV,
+        'import_ms': 800, 'wall_ms': 1500,
+        'forbidden': ['sklearn', 'statsmodels', 'joblib']
+    },
+    'insight-json': {
+        'argv': ['insight_generator.py', json.dumps(REPORT_INPUT), '--json'],
+        'import_ms': 200, 'wall_ms': 500,
+        'forbidden': ['numpy', 'pandas', 'sklearn', 'statsmodels', 'joblib']
+    },
+}
+
+def parse_importtime(stderr):
+    """
+    Total import time and the set of imported top-level packages
+
+    Returns:
+        (total_ms, packages, top) where top holds the slowest top-level imports
+    """
+    total_us = 0
+    packages = set()
+    top = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        # Format: "import time: <self us> | <cumulative us> | <indent><module>"
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        module = name.strip()
+        packages.add(module.split('.')[0])
+        # Top-level imports are the unindented ones; their cumulative times add up
+        if not name[1:].startswith(' '):
+            total_us += int(cumulative_us)
+            top.append((int(cumulative_us) / 1000, module))
+    top.sort(reverse=True)
+    return total_us / 1000, packages, top[:5]
+
+def run_action(argv, stdin=None):
+    command = [sys.executable, '-X', 'importtime', '-W', 'ignore', os.path.join(SCRIPTS_DIR, argv[0])] + argv[1:]
+    start = time.perf_counter()
+    completed = subprocess.run(command, input=stdin or '', capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+    if completed.returncode != 0:
+        raise RuntimeError(f"{' '.join(argv)} exited with {completed.returncode}: {completed.stderr[-500:]}")
+    import_ms, packages, top = parse_importtime(completed.stderr)
+    return {'wall_ms': wall_ms, 'import_ms': import_ms, 'packages': packages, 'top': top}
+
+def measure(spec, repeat):
+    runs = [run_action(spec['argv'], spec.get('stdin')) for _ in range(repeat)]
+    packages = set().union(*(run['packages'] for run in runs))
+    return {
+        'import_ms': statistics.median(run['import_ms'] for run in runs),
+        'wall_ms': statistics.median(run['wall_ms'] for run in runs),
+        'forbidden_imported': sorted(packages & set(spec['forbidden'])),
+        'slowest_imports': runs[-1]['top']
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Check CLI cold-start time against per-action budgets")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiply every budget, e.g. 2 on slow CI machines")
+    parser.add_argument('--only', nargs='+', choices=sorted(ACTIONS), help="Benchmark only these actions")
+    parser.add_argument('--json', help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = {}
+    failures = []
+    print(f"{'action':<16}{'import ms':>11}{'budget':>9}{'wall ms':>10}{'budget':>9}  status")
+    for name in args.only or ACTIONS:
+        spec = ACTIONS[name]
+        row = measure(spec, args.repeat)
+        problems = []
+        if row['import_ms'] > spec['import_ms'] * args.scale:
+            problems.append('import time over budget')
+        if row['wall_ms'] > spec['wall_ms'] * args.scale:
+            problems.append('wall time over budget')
+        if row['forbidden_imported']:
+            problems.append('imports ' + ', '.join(row['forbidden_imported']))
+        row['problems'] = problems
+        results[name] = row
+
+        print(f"{name:<16}{row['import_ms']:>11.1f}{spec['import_ms'] * args.scale:>9.0f}"
+              f"{row['wall_ms']:>10.1f}{spec['wall_ms'] * args.scale:>9.0f}  {'; '.join(problems) or 'ok'}")
+        if problems:
+            failures.append(name)
+            for ms, module in row['slowest_imports']:
+                print(f"    {ms:>9.1f} ms  {module}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if failures:
+        print(f"✗ Startup budget exceeded: {', '.join(failures)}")
+        sys.exit(1)
+    print("✓ All actions within their startup budgets")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+"""
+AI Engine Server
+Long-lived worker that serves AI predictions over JSON lines (stdin/stdout)
+
+Each request is one JSON object per line:
+    {"id": 1, "action": "risk", "params": {"demand": 500, ...}}
+Each response is one JSON object per line:
+    {"id": 1, "result": {...}}  or  {"id": 1, "error": "..."}
+With AI_TIMING set, responses also carry a "timing" block (see timing.py).
+
+Newly published model versions are loaded and warmed in the background and
+swapped in atomically; requests never wait on loading or training.
+
+With --batch-window-ms the server runs on asyncio instead and micro-batches
+concurrent single-row "anomaly-check" and "risk" requests (see micro_batcher.py).
+"""
+
+import sys
+import json
+import asyncio
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import timing
+
+with timing.span('import'):
+    import predict
+    import anomaly_detection
+    import risk_forecasting
+    import insight_generator
+    import report_pipeline
+    import product_models
+    import arima_state
+    import result_cache
+    import micro_batcher
+    from model_registry import registry
+
+def handle_forecast(params):
+    return predict.forecast_demand(days=int(params.get('days', 30)))
+
+def handle_ingest_demand(params):
+    return arima_state.ingest(params.get('values', []))
+
+def handle_anomaly(params):
+    return predict.detect_anomaly(
+        float(params['temperature']),
+        float(params['quantity']),
+        float(params['delay'])
+    )
+
+def handle_anomaly_check(params):
+    # Non-object params are passed on, so detect_anomaly reports them in its error dict
+    mode = params.get('mode') if isinstance(params, dict) else None
+    return anomaly_detection.detect_anomaly(params, mode)
+
+def handle_anomaly_batch(params):
+    if params.get('by_product'):
+        return product_models.detect_anomalies_by_product(params.get('records', []))
+    return anomaly_detection.detect_anomalies(params.get('records', []), params.get('mode'))
+
+def handle_risk(params):
+    return risk_forecasting.predict_risk(params)
+
+def handle_risk_batch(params):
+    if params.get('by_product'):
+        return product_models.predict_risk_by_product(params.get('records', []))
+    return risk_forecasting.predict_risk_batch(params.get('records', []))
+
+def handle_fraud(params):
+    return predict.calculate_fraud_risk(
+        float(params['anomaly_score']),
+        float(params['delay_factor']),
+        float(params['trust_score'])
+    )
+
+def handle_scri(params):
+    return predict.calculate_scri(
+        float(params['fraud_risk']),
+        float(params['delay_score']),
+        float(params['temp_anomaly']),
+        float(params['demand_volatility'])
+    )
+
+def handle_fraud_batch(params):
+    return predict.calculate_fraud_risk_batch(
+        params.get('anomaly_score', []),
+        params.get('delay_factor', []),
+        params.get('trust_score', [])
+    )
+
+def handle_scri_batch(params):
+    return predict.calculate_scri_batch(
+        params.get('fraud_risk', []),
+        params.get('delay_score', []),
+        params.get('temp_anomaly', []),
+        params.get('demand_volatility', [])
+    ).tolist()
+
+def handle_report(params):
+    return insight_generator.generate_insight_report(params)
+
+def handle_report_json(params):
+    return insight_generator.build_insight_report(params)
+
+def handle_generate_report(params):
+    return report_pipeline.generate_full_report(params)
+
+def handle_ping(params):
+    return {"status": "ok"}
+
+def handle_stats(params):
+    stats = {"model_version": registry.version(), "last_swap": registry.last_swap,
+             "models": registry.stats(), "product_shards": product_models.store.stats(),
+             "result_cache": result_cache.stats()}
+    if _scoring_service is not None:
+        stats["micro_batching"] = _scoring_service.stats()
+    if timing.ENABLED:
+        stats["timing"] = timing.snapshot()
+    return stats
+
+HANDLERS = {
+    'forecast': handle_forecast,
+    'ingest-demand': handle_ingest_demand,
+    'anomaly': handle_anomaly,
+    'anomaly-check': handle_anomaly_check,
+    'anomaly-batch': handle_anomaly_batch,
+    'risk': handle_risk,
+    'risk-batch': handle_risk_batch,
+    'fraud': handle_fraud,
+    'scri': handle_scri,
+    'fraud-batch': handle_fraud_batch,
+    'scri-batch': handle_scri_batch,
+    'report': handle_report,
+    'report-json': handle_report_json,
+    'generate-report': handle_generate_report,
+    'ping': handle_ping,
+    'stats': handle_stats,
+}
+
+# Actions answered through the micro-batcher in serve_async(), by scoring kind
+BATCHED_ACTIONS = {'anomaly-check': 'anomaly', 'risk': 'risk'}
+
+_scoring_service = None
+
+def warm_up():
+    """Load every model once so the first request does not pay for it"""
+    loaders = [predict.load_models, predict.forecast_demand, anomaly_detection.load_scoring_model,
+               anomaly_detection.load_model, risk_forecasting.load_scorer, risk_forecasting.load_top_factors]
+    for loader in loaders:
+        try:
+            loader()
+        except Exception as e:
+            print(f"Warm-up skipped for {loader.__module__}.{loader.__name__}: {e}", file=sys.stderr)
+
+def dispatch(request):
+    """Run a single request and build its response"""
+    request_id = request.get('id')
+    handler = HANDLERS.get(request.get('action'))
+    if handler is None:
+        return {"id": request_id, "error": f"Unknown action: {request.get('action')}"}
+    with timing.collect() as request_timing:
+        try:
+            response = {"id": request_id, "result": handler(request.get('params') or {})}
+        except Exception as e:
+            response = {"id": request_id, "error": str(e)}
+    if request_timing is not None:
+        response["timing"] = request_timing.block()
+        timing.maybe_write_prometheus()
+    return response
+
+def serve(workers=4, instream=None, outstream=None):
+    """Read requests line by line and answer them from a worker pool"""
+    instream = instream or sys.stdin
+    outstream = outstream or sys.stdout
+    write_lock = threading.Lock()
+
+    def respond(response):
+        line = json.dumps(response)
+        with write_lock:
+            outstream.write(line + "\n")
+            outstream.flush()
+
+    def run(request):
+        respond(dispatch(request))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for line in instream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                respond({"id": None, "error": f"Invalid JSON: {e}"})
+                continue
+            pool.submit(run, request)
+
+async def serve_async(workers=4, max_wait=micro_batcher.MAX_WAIT, max_batch=micro_batcher.MAX_BATCH,
+                      instream=None, outstream=None):
+    """
+    Serve with an event loop: single-row scoring requests are micro-batched,
+    everything else runs on the worker pool as in serve()
+    """
+    global _scoring_service
+    instream = instream or sys.stdin
+    outstream = outstream or sys.stdout
+    loop = asyncio.get_running_loop()
+    pool = ThreadPoolExecutor(max_workers=workers)
+    lines = asyncio.Queue()
+
+    def read_lines():
+        # Blocking stdin reads get their own thread so they never hold up scoring
+        for line in instream:
+            loop.call_soon_threadsafe(lines.put_nowait, line)
+        loop.call_soon_threadsafe(lines.put_nowait, None)
+
+    threading.Thread(target=read_lines, name='request-reader', daemon=True).start()
+    _scoring_service = micro_batcher.ScoringService(max_batch, max_wait, executor=pool, max_in_flight=workers)
+    _scoring_service.start()
+    pending = set()
+
+    def respond(response):
+        # Only called on the loop's thread, so lines never interleave
+        outstream.write(json.dumps(response) + "\n")
+        outstream.flush()
+
+    async def run(request):
+        kind = BATCHED_ACTIONS.get(request.get('action'))
+        params = request.get('params') or {}
+        if kind is not None and isinstance(params, dict) and params.get('mode'):
+            # Batched per scoring mode; modes without a batcher are served singly
+            kind = f"{kind}-{params['mode']}"
+            if kind not in micro_batcher.SCORERS:
+                kind = None
+        if kind is None:
+            response = await loop.run_in_executor(pool, dispatch, request)
+        else:
+            try:
+                response = {"id": request.get('id'), "result": await _scoring_service.score(kind, params)}
+            except Exception as e:
+                # Same shape as dispatch() gives a failing handler
+                response = {"id": request.get('id'), "error": str(e)}
+        respond(response)
+
+    try:
+        while True:
+            line = await lines.get()
+            if line is None:
+                break
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                respond({"id": None, "error": f"Invalid JSON: {e}"})
+                continue
+            task = asyncio.ensure_future(run(request))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.gather(*pending)
+    finally:
+        await _scoring_service.stop()
+        pool.shutdown(wait=False)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve AI predictions over JSON lines")
+    parser.add_argument('--workers', type=int, default=4, help="Number of requests served concurrently")
+    parser.add_argument('--batch-window-ms', type=float, default=0,
+                        help="Micro-batch single-row anomaly/risk requests arriving within this window (0 = off)")
+    parser.add_argument('--max-batch', type=int, default=micro_batcher.MAX_BATCH,
+                        help="Largest micro-batch scored in one call")
+    args = parser.parse_args()
+
+    # Keep stdout reserved for protocol messages; stray prints go to stderr
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+
+    warm_up()
+    registry.watch(warm=warm_up)
+    print(f"✓ AI engine server ready (model version {registry.version() or 'unversioned'})", file=sys.stderr)
+    if args.batch_window_ms > 0:
+        asyncio.run(serve_async(args.workers, args.batch_window_ms / 1000, args.max_batch, outstream=protocol_out))
+    else:
+        serve(workers=args.workers, outstream=protocol_out)
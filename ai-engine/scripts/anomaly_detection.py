@@ -5,93 +5,290 @@ Detects unusual patterns in supply chain data
 
 import sys
 import json
-import pandas as pd
-import joblib
+import numpy as np
 import os
-from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import StandardScaler
+import time
+import timing
+import result_cache
+from model_registry import registry, save_artifact
+from packed_forest import save_packed_forest, load_packed_forest
 
 # Paths
 MODEL_PATH = 'ai-engine/models/anomaly_model.pkl'
 SCALER_PATH = 'ai-engine/models/anomaly_scaler.pkl'
+SCALER_PARAMS_PATH = 'ai-engine/models/anomaly_scaler.json'
+PACKED_MODEL_PATH = 'ai-engine/models/anomaly_model.packed'
+FAST_MODE_PATH = 'ai-engine/models/anomaly_fast_mode.json'
 DATA_PATH = 'ai-engine/data/sample_data.csv'
 
-def train_anomaly_model():
+FEATURES = ['demand', 'quantity', 'delay_days', 'temperature', 'stock_level']
+BATCH_CHUNK_SIZE = 50000
+
+# Batches up to this size are scored with the memory-mapped packed forest,
+# which avoids sklearn's per-call overhead; larger ones use the sklearn model
+PACKED_MAX_ROWS = 1000
+
+# Isolation Forest hyperparameters (also fingerprinted by train_models.py)
+MODEL_PARAMS = {'contamination': 0.05, 'random_state': 42, 'n_estimators': 100}
+
+# Scoring modes: 'full' uses every tree; 'fast' uses the smallest prefix of
+# trees whose anomaly labels agree with the full forest on at least
+# FAST_MODE_AGREEMENT of held-out rows (chosen at training time)
+MODES = ('full', 'fast')
+DEFAULT_MODE = os.environ.get('AI_ANOMALY_MODE', 'full')
+FAST_MODE_AGREEMENT = float(os.environ.get('AI_ANOMALY_FAST_AGREEMENT', 0.99))
+FAST_MODE_ROWS = 20000
+
+# Fixed random share of the rows held out of training to measure fast-mode
+# agreement; with fewer held-out rows than FAST_MODE_MIN_VALIDATION the
+# agreement cannot be trusted and fast mode keeps every tree
+VALIDATION_FRACTION = 0.2
+VALIDATION_SEED = 7
+FAST_MODE_MIN_VALIDATION = 1000
+
+def train_anomaly_model(n_jobs=None):
     """Train Isolation Forest model for anomaly detection"""
-    print("Training Anomaly Detection Model...")
+    # Training-only imports, kept off the scoring path
+    from sklearn.ensemble import IsolationForest
+    from data_loader import load_dataset, fit_scaler
     
-    # Load data
-    df = pd.read_csv(DATA_PATH)
+    print("Training Anomaly Detection Model...")
     
-    # Select numerical features
-    features = ['demand', 'quantity', 'delay_days', 'temperature', 'stock_level']
-    X = df[features].fillna(0)
+    # Load data (memory-mapped columnar cache of the CSV)
+    dataset = load_dataset(DATA_PATH)
     
-    # Scale features
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
+    # Scale features, streaming over every row
+    scaler = fit_scaler(dataset, FEATURES)
     
-    # Train Isolation Forest
-    model = IsolationForest(
-        contamination=0.05,
-        random_state=42,
-        n_estimators=100
-    )
+    # Train Isolation Forest on a bounded sample of the non-held-out rows
+    # (it has no partial_fit)
+    train_pool, validation_rows = split_validation(dataset.rows)
+    train_rows = dataset.sample_rows(rows=train_pool)
+    X_scaled = scaler.transform(dataset.matrix(FEATURES, train_rows))
+    model = IsolationForest(n_jobs=n_jobs, **MODEL_PARAMS)
     model.fit(X_scaled)
+    model.set_params(n_jobs=None)
     
     # Save model and scaler
     os.makedirs('ai-engine/models', exist_ok=True)
-    joblib.dump(model, MODEL_PATH)
-    joblib.dump(scaler, SCALER_PATH)
+    save_artifact(model, MODEL_PATH)
+    save_artifact(scaler, SCALER_PATH)
+    save_scaler_params(scaler, registry.resolve(SCALER_PARAMS_PATH))
+    save_packed_forest(model, registry.resolve(PACKED_MODEL_PATH))
+    
+    # Pick the fast mode's tree prefix: offsets from training rows only,
+    # agreement on the held-out rows
+    validation_rows = dataset.sample_rows(FAST_MODE_ROWS, rows=validation_rows)
+    calibration = X_scaled[dataset.sample_rows(FAST_MODE_ROWS, rows=np.arange(len(X_scaled)))]
+    fast_mode = select_fast_mode(load_packed_forest(registry.resolve(PACKED_MODEL_PATH)), calibration,
+                                 scaler.transform(dataset.matrix(FEATURES, validation_rows)))
+    save_fast_mode(fast_mode, registry.resolve(FAST_MODE_PATH))
     
     print("✓ Anomaly Detection Model trained and saved")
+    print(f"✓ Fast mode: {fast_mode['n_trees']}/{fast_mode['n_trees_full']} trees, "
+          f"{fast_mode['agreement']:.1%} label agreement on {fast_mode['validation_rows']} held-out rows, "
+          f"{fast_mode['speedup']:.1f}x faster per row")
     return model, scaler
 
+def split_validation(n_rows, fraction=VALIDATION_FRACTION, seed=VALIDATION_SEED):
+    """Row indices (train, validation), holding out a fixed random fraction"""
+    rows = np.random.RandomState(seed).permutation(n_rows)
+    n_validation = int(round(n_rows * fraction))
+    return np.sort(rows[n_validation:]), np.sort(rows[:n_validation])
+
+def select_fast_mode(packed, X_calibration, X_validation, target=FAST_MODE_AGREEMENT,
+                     min_validation=FAST_MODE_MIN_VALIDATION):
+    """
+    Choose the smallest prefix of trees whose anomaly labels match the full forest's
+    
+    Each prefix gets its own offset, set as IsolationForest sets offset_: the
+    contamination percentile of its scores on (a sample of) the training rows.
+    
+    Args:
+        packed: Packed full forest
+        X_calibration: Scaled training rows for the prefix offsets
+        X_validation: Scaled held-out rows on which label agreement is measured
+        target: Minimum fraction of matching anomaly labels
+        min_validation: Fewer validation rows than this keep every tree
+    
+    Returns:
+        Dictionary with n_trees, offset, agreement, speedup and timings
+    """
+    n_trees = packed.n_trees
+    denominators = np.arange(1, n_trees + 1)[:, None] * packed.meta['average_path_length_max_samples']
+    
+    def prefix_scores(X):
+        # Running sums over the trees give the scores of every prefix at once
+        return -(2 ** (-np.cumsum(packed.tree_values(X), axis=0) / denominators))
+    
+    offsets = np.percentile(prefix_scores(X_calibration), 100.0 * MODEL_PARAMS['contamination'], axis=1)
+    offsets[-1] = packed.offset_
+    is_anomaly = prefix_scores(X_validation) < offsets[:, None]
+    agreement = (is_anomaly == is_anomaly[-1]).mean(axis=1)
+    # The full forest always agrees with itself, so a prefix is always found
+    chosen = int(np.argmax(agreement >= target))
+    if len(X_validation) < min_validation:
+        chosen = n_trees - 1
+    fast = packed.with_trees(chosen + 1, float(offsets[chosen]))
+    
+    full_ms = _single_row_ms(packed, X_validation)
+    fast_ms = _single_row_ms(fast, X_validation) if chosen + 1 < n_trees else full_ms
+    return {
+        'n_trees': chosen + 1,
+        'n_trees_full': n_trees,
+        'offset': float(offsets[chosen]),
+        'target_agreement': target,
+        'agreement': float(agreement[chosen]),
+        'validation_rows': len(X_validation),
+        'min_validation_rows': min_validation,
+        'full_ms': full_ms,
+        'fast_ms': fast_ms,
+        'speedup': full_ms / fast_ms if fast_ms > 0 else 1.0
+    }
+
+def _single_row_ms(model, X, rows=200):
+    """Mean milliseconds to score one row, as detect_anomaly does"""
+    X = X[:rows]
+    score_rows(model, X[:1])
+    start = time.perf_counter()
+    for i in range(len(X)):
+        score_rows(model, X[i:i + 1])
+    return (time.perf_counter() - start) * 1000 / max(len(X), 1)
+
+def save_fast_mode(fast_mode, path):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(fast_mode, f, indent=2)
+    os.replace(tmp_path, path)
+
+def score_rows(model, X_scaled):
+    """
+    Anomaly flags and scores of scaled rows
+    
+    Flags are computed as IsolationForest.predict does (score below offset_),
+    but from the same score_samples pass instead of a second one. Raises
+    ValueError for NaN or infinite features, as sklearn does.
+    """
+    if not np.isfinite(X_scaled).all():
+        raise ValueError("Input contains NaN or infinity")
+    scores = model.score_samples(X_scaled)
+    return scores < model.offset_, scores
+
+class ScalerParams:
+    """Fitted StandardScaler statistics, usable without importing sklearn"""
+    
+    def __init__(self, mean, scale):
+        self.mean_ = np.asarray(mean, dtype=np.float64)
+        self.scale_ = np.asarray(scale, dtype=np.float64)
+    
+    def transform(self, X):
+        # Same arithmetic as StandardScaler.transform
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+def save_scaler_params(scaler, path):
+    """Write a scaler's mean and scale as JSON (float repr round-trips exactly)"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'mean': scaler.mean_.tolist(), 'scale': scaler.scale_.tolist()}, f)
+    os.replace(tmp_path, path)
+
+def load_scaler_params(path):
+    with open(path, 'r') as f:
+        params = json.load(f)
+    return ScalerParams(params['mean'], params['scale'])
+
 def load_model():
-    """Load trained model or train new one"""
-    if os.path.exists(MODEL_PATH) and os.path.exists(SCALER_PATH):
-        model = joblib.load(MODEL_PATH)
-        scaler = joblib.load(SCALER_PATH)
-        return model, scaler
-    else:
-        return train_anomaly_model()
+    """Load the trained model and scaler (raises ModelNotFoundError if untrained)"""
+    return registry.load(MODEL_PATH), registry.load(SCALER_PATH)
+
+def load_scoring_model(n_rows=1, mode=None):
+    """
+    Load the scorer best suited to a batch of n_rows, plus the scaler
+    
+    Small batches use the packed forest and the JSON scaler, which need only
+    NumPy; sklearn is imported only when the pickled model is used. mode
+    'fast' scores with the tree prefix chosen at training time, falling back
+    to the full forest for models trained before fast mode existed.
+    """
+    mode = mode or DEFAULT_MODE
+    if mode not in MODES:
+        raise ValueError(f"Unknown anomaly scoring mode: {mode} (expected one of {', '.join(MODES)})")
+    if mode == 'fast' and registry.exists(PACKED_MODEL_PATH, SCALER_PARAMS_PATH, FAST_MODE_PATH):
+        fast_mode = registry.load(FAST_MODE_PATH)
+        packed = registry.load(PACKED_MODEL_PATH).with_trees(fast_mode['n_trees'], fast_mode['offset'])
+        return packed, registry.load(SCALER_PARAMS_PATH, load_scaler_params)
+    if n_rows <= PACKED_MAX_ROWS and registry.exists(PACKED_MODEL_PATH, SCALER_PARAMS_PATH):
+        return registry.load(PACKED_MODEL_PATH), registry.load(SCALER_PARAMS_PATH, load_scaler_params)
+    return load_model()
+
+_result_cache = result_cache.get_cache('anomaly')
+
+def _shard_paths(input_dict):
+    """Artifact paths of the row's product anomaly shard, or None to use the global model"""
+    if input_dict.get('product') is None:
+        return None
+    # product_models imports this module, so it is imported on first use
+    import product_models
+    return product_models.shard_paths(input_dict['product'], 'anomaly')
+
+def _shard_models(input_dict):
+    """(model, scaler) of the row's product anomaly shard, or None to use the global model"""
+    if input_dict.get('product') is None:
+        return None
+    import product_models
+    return product_models.shard_models(input_dict['product'], 'anomaly')
 
-def detect_anomaly(input_dict):
+def _scoring_model_key(input_dict):
+    # The artifacts _detect_anomaly() scores the row with
+    paths = _shard_paths(input_dict)
+    if paths:
+        return tuple(registry.artifact_key(path) for path in paths)
+    try:
+        return registry.artifact_key(PACKED_MODEL_PATH), registry.artifact_key(SCALER_PARAMS_PATH)
+    except FileNotFoundError:
+        return registry.artifact_key(MODEL_PATH), registry.artifact_key(SCALER_PATH)
+
+def detect_anomaly(input_dict, mode=None):
     """
     Detect if input data is anomalous
     
     Args:
-        input_dict: Dictionary with keys: demand, quantity, delay_days, temperature, stock_level
+        input_dict: Dictionary with keys: demand, quantity, delay_days, temperature, stock_level,
+                    and optionally product (scored with that product's shard when it has one)
+        mode: 'full' or 'fast' (default: AI_ANOMALY_MODE, else 'full'); product shards
+              always use every tree
     
     Returns:
-        Dictionary with anomaly status and score
+        Dictionary with anomaly status and score (from the result cache when enabled)
     """
+    mode = mode or DEFAULT_MODE
+    return _result_cache.cached(
+        lambda: (mode,) + _scoring_model_key(input_dict),
+        lambda: [input_dict.get(name, 0) for name in FEATURES],
+        lambda: _detect_anomaly(input_dict, mode)
+    )
+
+def _detect_anomaly(input_dict, mode=None):
     try:
-        # Load model
-        model, scaler = load_model()
+        # Load model: the product's shard if it has one, else the global model
+        model, scaler = _shard_models(input_dict) or load_scoring_model(mode=mode)
         
         # Prepare input
-        features = ['demand', 'quantity', 'delay_days', 'temperature', 'stock_level']
-        input_data = [[
-            input_dict.get('demand', 0),
-            input_dict.get('quantity', 0),
-            input_dict.get('delay_days', 0),
-            input_dict.get('temperature', 0),
-            input_dict.get('stock_level', 0)
-        ]]
+        input_data = [[input_dict.get(name, 0) for name in FEATURES]]
         
         # Scale input
-        input_scaled = scaler.transform(input_data)
+        with timing.span('anomaly.scale'):
+            input_scaled = scaler.transform(input_data)
         
         # Predict
-        prediction = model.predict(input_scaled)[0]  # -1 for anomaly, 1 for normal
-        score = model.score_samples(input_scaled)[0]  # Anomaly score (lower = more anomalous)
+        with timing.span('anomaly.predict'):
+            # Anomaly score: lower = more anomalous
+            is_anomaly, scores = score_rows(model, input_scaled)
+        score = scores[0]
         
         # Convert to readable format
-        is_anomaly = prediction == -1
-        
         return {
-            "anomaly": bool(is_anomaly),
+            "anomaly": bool(is_anomaly[0]),
             "score": float(score),
             "severity": "HIGH" if score < -0.5 else "MEDIUM" if score < -0.2 else "LOW"
         }
@@ -103,13 +300,96 @@ def detect_anomaly(input_dict):
             "score": 0
         }
 
+def feature_frame(records):
+    """Build the model's feature matrix from a DataFrame or a list of dicts"""
+    import pandas as pd
+    if not isinstance(records, pd.DataFrame):
+        records = pd.DataFrame.from_records(list(records), columns=FEATURES)
+    return records.reindex(columns=FEATURES).fillna(0)
+
+def feature_matrix(records):
+    """
+    float64 feature matrix; lists of dicts are converted without pandas
+    
+    Missing keys and None become 0, as in feature_frame.
+    """
+    if hasattr(records, 'reindex'):
+        return feature_frame(records).to_numpy(dtype=np.float64)
+    X = np.array([[row.get(name) for name in FEATURES] for row in records], dtype=np.float64)
+    X = X.reshape(-1, len(FEATURES))
+    X[np.isnan(X)] = 0
+    return X
+
+def detect_anomalies(records, mode=None):
+    """
+    Detect anomalies for many rows in a single vectorized pass
+    
+    Args:
+        records: List of dicts, a DataFrame, or a path to a CSV file with the
+                 columns demand, quantity, delay_days, temperature, stock_level
+        mode: 'full' or 'fast' (default: AI_ANOMALY_MODE, else 'full')
+    
+    Returns:
+        List of dictionaries with anomaly status, score and severity per row
+    """
+    if isinstance(records, str):
+        import pandas as pd
+        records = pd.read_csv(records)
+    
+    with timing.span('anomaly.features'):
+        X = feature_matrix(records)
+    if len(X) == 0:
+        return []
+    
+    model, scaler = load_scoring_model(len(X), mode)
+    with timing.span('anomaly.scale'):
+        X_scaled = (X - scaler.mean_) / scaler.scale_
+    
+    # One scoring pass over the whole matrix
+    with timing.span('anomaly.predict'):
+        is_anomaly, scores = score_rows(model, X_scaled)
+    severity = np.select([scores < -0.5, scores < -0.2], ["HIGH", "MEDIUM"], default="LOW")
+    
+    return [
+        {"anomaly": anomaly, "score": score, "severity": level}
+        for anomaly, score, level in zip(is_anomaly.tolist(), scores.tolist(), severity.tolist())
+    ]
+
+def stream_anomalies(csv_path, chunksize=BATCH_CHUNK_SIZE, out=None, mode=None):
+    """Score a CSV file chunk by chunk and write one JSON line per row"""
+    import pandas as pd
+    out = out or sys.stdout
+    source = sys.stdin if csv_path == '-' else csv_path
+    for chunk in pd.read_csv(source, chunksize=chunksize):
+        out.write("".join(json.dumps(result) + "\n" for result in detect_anomalies(chunk, mode)))
+    out.flush()
+
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
+    # Optional "--mode full|fast" (or --mode=...) anywhere on the command line,
+    # for the batch and CLI modes
+    mode = None
+    for position, arg in enumerate(sys.argv[1:], 1):
+        if arg == '--mode':
+            if position + 1 >= len(sys.argv):
+                print(json.dumps({"error": f"--mode needs a value ({', '.join(MODES)})"}))
+                sys.exit(2)
+            mode = sys.argv[position + 1]
+            del sys.argv[position:position + 2]
+            break
+        if arg.startswith('--mode='):
+            mode = arg.split('=', 1)[1]
+            del sys.argv[position]
+            break
+    
+    if len(sys.argv) > 2 and sys.argv[1] == '--batch':
+        # Batch mode - score a CSV file (or '-' for stdin) as JSON lines
+        stream_anomalies(sys.argv[2], mode=mode)
+    elif len(sys.argv) > 1:
         # CLI mode - receive JSON input
         try:
             input_json = sys.argv[1]
             input_data = json.loads(input_json)
-            result = detect_anomaly(input_data)
+            result = detect_anomaly(input_data, mode)
             print(json.dumps(result))
         except Exception as e:
             print(json.dumps({"error": str(e)}))
@@ -0,0 +1,233 @@
+"""
+Incremental ARIMA Updates
+Appends new daily demand observations to the fitted ARIMA results with the
+existing parameters (statsmodels' results.append(refit=False)) and persists
+the updated state, refitting parameters only on a schedule or on error drift
+
+Ingesting a day takes milliseconds; a refit reuses the current parameters as
+starting values. The forecast cache in predict.py is keyed by the model file,
+so forecasts move to the new state automatically.
+
+Updates hold an exclusive lock on ai-engine/models/arima.lock for the whole
+read-modify-write, so the CLI and a serving process ingesting at the same
+time neither lose observations nor see the state of one update next to the
+model of another.
+
+Usage:
+    python ai-engine/scripts/arima_state.py ingest 1012.5 998.1 [--refit-every 30] [--drift-ratio 1.5]
+    python ai-engine/scripts/arima_state.py ingest --csv new_days.csv
+    python ai-engine/scripts/arima_state.py status | refit
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import contextlib
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+from model_registry import registry, save_artifact
+
+MODEL_PATH = 'ai-engine/models/arima_model.pkl'
+STATE_PATH = 'ai-engine/models/arima_state.json'
+# Shared by every version, so it is not resolved through the registry
+LOCK_PATH = 'ai-engine/models/arima.lock'
+
+# Refit after this many appended observations, or when the mean absolute
+# one-step error over the last ERROR_WINDOW days exceeds DRIFT_RATIO times
+# the error measured at the last refit
+REFIT_EVERY = 30
+DRIFT_RATIO = 1.5
+ERROR_WINDOW = 14
+
+_lock = threading.Lock()
+
+@contextlib.contextmanager
+def _state_lock():
+    """Exclusive access to the ARIMA model and state, across threads and processes"""
+    with _lock:
+        os.makedirs(os.path.dirname(LOCK_PATH), exist_ok=True)
+        with open(LOCK_PATH, 'a+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                # LK_LOCK retries for about 10 seconds before raising OSError
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+def _write_state(state):
+    state_path = registry.resolve(STATE_PATH)
+    tmp_path = state_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, state_path)
+
+def _baseline_error(results):
+    """Mean absolute in-sample one-step error over the last ERROR_WINDOW points"""
+    return float(np.mean(np.abs(np.asarray(results.resid)[-ERROR_WINDOW:])))
+
+def reset_state(results, reason='train'):
+    """Start a fresh update state for newly fitted results (called after training)"""
+    state = {
+        'nobs': int(results.nobs),
+        'order': list(results.model.order),
+        'appended_since_refit': 0,
+        'recent_errors': [],
+        'baseline_error': _baseline_error(results),
+        'last_refit': _now(),
+        'last_refit_reason': reason,
+        'last_update': _now()
+    }
+    _write_state(state)
+    return state
+
+def load_state():
+    """Current update state; rebuilt from the model if missing or stale"""
+    with _state_lock():
+        return _load_state()
+
+def _load_state():
+    # Callers hold _state_lock()
+    results = registry.load(MODEL_PATH)
+    try:
+        with open(registry.resolve(STATE_PATH), 'r') as f:
+            state = json.load(f)
+        if state.get('nobs') == int(results.nobs):
+            return state
+    except (OSError, ValueError):
+        pass
+    # The model was retrained (or the state lost) since the last update
+    return reset_state(results, reason='state rebuilt')
+
+def refit_reason(state, refit_every=REFIT_EVERY, drift_ratio=DRIFT_RATIO):
+    """Why the parameters should be refitted now, or None"""
+    if state['appended_since_refit'] >= refit_every:
+        return f"schedule ({state['appended_since_refit']} new observations)"
+    errors = state['recent_errors'][-ERROR_WINDOW:]
+    if len(errors) >= ERROR_WINDOW and state['baseline_error'] > 0:
+        ratio = float(np.mean(errors)) / state['baseline_error']
+        if ratio > drift_ratio:
+            return f"drift (error {ratio:.2f}x baseline)"
+    return None
+
+def _refit(results):
+    from statsmodels.tsa.arima.model import ARIMA
+    endog = results.model.data.orig_endog
+    return ARIMA(endog, order=results.model.order).fit(start_params=results.params)
+
+def ingest(values, refit_every=REFIT_EVERY, drift_ratio=DRIFT_RATIO):
+    """
+    Append new observations to the fitted ARIMA state
+
+    Args:
+        values: New daily demand values, oldest first
+        refit_every: Refit after this many appended observations
+        drift_ratio: Refit when recent one-step error exceeds this multiple of the baseline
+
+    Returns:
+        Dictionary with appended, nobs, seconds, the recent mean error and the
+        refit reason (None when the parameters were kept)
+    """
+    import pandas as pd
+    values = np.asarray(values, dtype=np.float64).ravel()
+    if len(values) == 0 or not np.all(np.isfinite(values)):
+        raise ValueError("Observations must be a non-empty list of finite numbers")
+
+    with _state_lock():
+        start = time.perf_counter()
+        state = _load_state()
+        results = registry.load(MODEL_PATH)
+
+        # Continue the model's integer index so forecasts keep their positions
+        index = pd.RangeIndex(int(results.nobs), int(results.nobs) + len(values))
+        updated = results.append(pd.Series(values, index=index, name='quantity'), refit=False)
+
+        # One-step-ahead errors of the appended points, from the filter
+        errors = np.abs(values - np.asarray(updated.fittedvalues)[-len(values):])
+        state['recent_errors'] = (state['recent_errors'] + errors.tolist())[-ERROR_WINDOW:]
+        state['appended_since_refit'] += len(values)
+
+        reason = refit_reason(state, refit_every, drift_ratio)
+        if reason:
+            updated = _refit(updated)
+            state.update({
+                'appended_since_refit': 0,
+                'recent_errors': [],
+                'baseline_error': _baseline_error(updated),
+                'last_refit': _now(),
+                'last_refit_reason': reason
+            })
+
+        save_artifact(updated, MODEL_PATH)
+        registry.put(MODEL_PATH, updated)
+        state['nobs'] = int(updated.nobs)
+        state['last_update'] = _now()
+        _write_state(state)
+
+    return {
+        'appended': len(values),
+        'nobs': state['nobs'],
+        'mean_error': float(np.mean(errors)),
+        'refit': reason,
+        'seconds': time.perf_counter() - start
+    }
+
+def refit():
+    """Refit the parameters now, on all observations so far"""
+    with _state_lock():
+        updated = _refit(registry.load(MODEL_PATH))
+        save_artifact(updated, MODEL_PATH)
+        registry.put(MODEL_PATH, updated)
+        return reset_state(updated, reason='manual')
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental ARIMA state updates")
+    commands = parser.add_subparsers(dest='command')
+    ingest_parser = commands.add_parser('ingest', help="Append new daily observations")
+    ingest_parser.add_argument('values', nargs='*', type=float)
+    ingest_parser.add_argument('--csv', help="CSV file with a quantity column")
+    ingest_parser.add_argument('--refit-every', type=int, default=REFIT_EVERY)
+    ingest_parser.add_argument('--drift-ratio', type=float, default=DRIFT_RATIO)
+    commands.add_parser('status', help="Show the update state")
+    commands.add_parser('refit', help="Refit the parameters now")
+    args = parser.parse_args()
+
+    if args.command == 'ingest':
+        values = list(args.values)
+        if args.csv:
+            import pandas as pd
+            values += pd.read_csv(args.csv)['quantity'].tolist()
+        result = ingest(values, args.refit_every, args.drift_ratio)
+        print(json.dumps(result))
+        print(f"✓ Ingested {result['appended']} observations in {result['seconds'] * 1000:.1f}ms"
+              f" (refit: {result['refit'] or 'none'})", file=sys.stderr)
+    elif args.command == 'status':
+        print(json.dumps(load_state(), indent=2))
+    elif args.command == 'refit':
+        print(json.dumps(refit(), indent=2))
+    else:
+        parser.print_help()
+
+if __name__ == '__main__':
+    main()
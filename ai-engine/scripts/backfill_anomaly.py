@@ -0,0 +1,203 @@
+"""
+Anomaly Backfill
+Rescores a shipment history CSV with the anomaly model across worker
+processes that share the feature matrix and the output arrays
+
+The CSV's feature columns are parsed once, chunk by chunk, as float64
+straight into a multiprocessing.shared_memory block (missing values become 0,
+as in detect_anomalies, so scores match it exactly). Each worker loads the
+model once, then scores row ranges in place: only (start, stop) pairs and row
+counts cross process boundaries, never rows or scores.
+
+Output is an .npz file with score and anomaly arrays in input row order, or a
+CSV with anomaly, score and severity per row.
+
+Usage:
+    python ai-engine/scripts/backfill_anomaly.py history.csv -o scores.npz [--workers 4] [--chunk-rows 50000]
+    python ai-engine/scripts/backfill_anomaly.py history.csv --workers 1,2,4    # compare throughput
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from anomaly_detection import FEATURES, MODEL_PATH, SCALER_PATH, DATA_PATH, BATCH_CHUNK_SIZE, score_rows
+from model_registry import registry, ModelNotFoundError
+
+# Per-process state set by _init_worker
+_worker = {}
+
+def _attach(name, shape, dtype):
+    block = SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+def _init_worker(model_path, mean, scale, blocks, rows):
+    """Load the model and map the shared arrays; runs once per worker process"""
+    model = registry.load(model_path)
+    # Scoring runs one estimator call per range; parallelism comes from the processes
+    if hasattr(model, 'n_jobs'):
+        model.n_jobs = None
+    handles = []
+    arrays = {}
+    for key, (name, width, dtype) in blocks.items():
+        shape = (rows, width) if width else (rows,)
+        block, arrays[key] = _attach(name, shape, dtype)
+        handles.append(block)
+    _worker.update(model=model, mean=mean, scale=scale, handles=handles, **arrays)
+
+def _score_range(bounds):
+    """Score rows [start, stop) of the shared matrix into the shared outputs"""
+    start, stop = bounds
+    X_scaled = (_worker['X'][start:stop] - _worker['mean']) / _worker['scale']
+    _worker['anomaly'][start:stop], _worker['score'][start:stop] = score_rows(_worker['model'], X_scaled)
+    return stop - start
+
+def _release_worker():
+    for block in _worker.pop('handles', []):
+        block.close()
+    _worker.clear()
+
+def _create(shape, dtype):
+    block = SharedMemory(create=True, size=max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1))
+    return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+def _ranges(rows, chunk_rows):
+    return [(start, min(start + chunk_rows, rows)) for start in range(0, rows, chunk_rows)]
+
+def _count_lines(path):
+    """Line count of a file; an upper bound on its CSV data rows plus the header"""
+    lines = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            lines += block.count(b'\n')
+    return lines + 1
+
+def _read_features(path, X, chunk_rows=BATCH_CHUNK_SIZE):
+    """Parse the FEATURES columns of a CSV into X chunk by chunk; returns the row count"""
+    import pandas as pd
+    rows = 0
+    for chunk in pd.read_csv(path, usecols=FEATURES, dtype=np.float64, chunksize=chunk_rows):
+        X[rows:rows + len(chunk)] = chunk[FEATURES].fillna(0).to_numpy(dtype=np.float64)
+        rows += len(chunk)
+    return rows
+
+def backfill(csv_path, workers=None, chunk_rows=BATCH_CHUNK_SIZE, repeat_workers=None):
+    """
+    Score every row of a CSV with the current anomaly model
+
+    Args:
+        csv_path: Shipment history CSV with the anomaly FEATURES columns
+        workers: Worker processes (default: all cores); 1 scores in this process
+        chunk_rows: Rows per range handed to a worker
+        repeat_workers: Optional further worker counts to time on the same
+                        shared matrix, for throughput comparisons
+
+    Returns:
+        Tuple (score, anomaly, stats) with copies of the output arrays and a
+        dict of rows, load_seconds and per-run workers/seconds/rows_per_second
+    """
+    workers = workers or os.cpu_count() or 1
+    # Pin one version for every worker, even if a new one is published meanwhile
+    model_path = registry.resolve(MODEL_PATH)
+    if not os.path.exists(model_path):
+        raise ModelNotFoundError(f"{MODEL_PATH} not found; run train_models.py first")
+    scaler = registry.load(SCALER_PATH)
+
+    start = time.perf_counter()
+    # Sized by the line count, then trimmed to the rows actually parsed
+    capacity = _count_lines(csv_path)
+    x_block, X = _create((capacity, len(FEATURES)), np.float64)
+    score_block, score = _create((capacity,), np.float64)
+    anomaly_block, anomaly = _create((capacity,), np.bool_)
+    try:
+        rows = _read_features(csv_path, X, chunk_rows)
+        X, score, anomaly = X[:rows], score[:rows], anomaly[:rows]
+        blocks = {
+            'X': (x_block.name, len(FEATURES), np.float64),
+            'score': (score_block.name, 0, np.float64),
+            'anomaly': (anomaly_block.name, 0, np.bool_)
+        }
+        load_seconds = time.perf_counter() - start
+
+        init_args = (model_path, scaler.mean_, scaler.scale_, blocks, rows)
+        ranges = _ranges(rows, chunk_rows)
+        runs = []
+        for count in [workers] + list(repeat_workers or []):
+            start = time.perf_counter()
+            if count == 1:
+                _init_worker(*init_args)
+                start = time.perf_counter()
+                try:
+                    scored = sum(_score_range(bounds) for bounds in ranges)
+                finally:
+                    _release_worker()
+            else:
+                with Pool(count, initializer=_init_worker, initargs=init_args) as pool:
+                    # Model loading happens in the initializer; time the scoring only
+                    pool.map(int, range(count))
+                    start = time.perf_counter()
+                    scored = sum(pool.imap_unordered(_score_range, ranges))
+            seconds = time.perf_counter() - start
+            runs.append({'workers': count, 'seconds': seconds,
+                         'rows_per_second': scored / seconds if seconds > 0 else 0.0})
+
+        return score.copy(), anomaly.copy(), {
+            'rows': rows, 'model': model_path, 'load_seconds': load_seconds, 'runs': runs
+        }
+    finally:
+        del X, score, anomaly
+        for block in (x_block, score_block, anomaly_block):
+            block.close()
+            block.unlink()
+
+def severity(scores):
+    """Severity labels with detect_anomalies' thresholds"""
+    return np.select([scores < -0.5, scores < -0.2], ["HIGH", "MEDIUM"], default="LOW")
+
+def write_output(path, score, anomaly, chunk_rows=BATCH_CHUNK_SIZE):
+    """Write scores as .npz (score, anomaly) or, for a .csv path, one row per shipment"""
+    if not path.endswith('.csv'):
+        np.savez(path, score=score, anomaly=anomaly)
+        return
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write("row,anomaly,score,severity\n")
+        for start, stop in _ranges(len(score), chunk_rows):
+            f.write("".join(
+                f"{row},{str(flag).lower()},{value!r},{level}\n"
+                for row, flag, value, level in zip(range(start, stop), anomaly[start:stop].tolist(),
+                                                   score[start:stop].tolist(), severity(score[start:stop]))
+            ))
+    os.replace(tmp_path, path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Rescore a shipment history with the anomaly model")
+    parser.add_argument('path', nargs='?', default=DATA_PATH, help="Shipment history CSV")
+    parser.add_argument('-o', '--output', help="Output .npz or .csv file (default: no output, timing only)")
+    parser.add_argument('--workers', default='0',
+                        help="Worker processes (0 = all cores); a comma-separated list times each count")
+    parser.add_argument('--chunk-rows', type=int, default=BATCH_CHUNK_SIZE, help="Rows per worker task")
+    args = parser.parse_args()
+
+    counts = [int(count) or os.cpu_count() or 1 for count in args.workers.split(',')]
+    score, anomaly, stats = backfill(args.path, counts[0], args.chunk_rows, counts[1:])
+    if args.output:
+        write_output(args.output, score, anomaly)
+
+    base = stats['runs'][0]['rows_per_second']
+    for run in stats['runs']:
+        run['speedup'] = run['rows_per_second'] / base if base else 0.0
+    stats['anomalies'] = int(anomaly.sum())
+    print(json.dumps(stats))
+    best = max(stats['runs'], key=lambda run: run['rows_per_second'])
+    print(f"✓ {stats['rows']} rows scored with {best['workers']} workers in {best['seconds']:.2f}s "
+          f"({best['rows_per_second']:,.0f} rows/s), {stats['anomalies']} anomalies", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""
+Batch Insight Reports
+Generates insight reports for large tables of forecast/anomaly/risk results,
+streaming them to a file or stdout with bounded memory and spreading chunks
+across worker processes
+
+Input is a CSV or JSON-lines table with one shipment per row, either nested
+like generate_insight_report's input or flat with the columns:
+    id, growth_percentage, confidence, anomaly, anomaly_score, severity,
+    risk_level, risk_probability, top_factors (';'-separated in CSV)
+
+Usage:
+    python ai-engine/scripts/batch_reports.py results.csv -o reports.txt [--format text|json] [--workers 4]
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+from collections import deque
+from multiprocessing import Pool
+
+from insight_generator import build_insight_report, generate_insight_report
+
+CHUNK_SIZE = 500
+
+# Chunks queued per worker; bounds memory to roughly workers * this * CHUNK_SIZE rows
+CHUNKS_IN_FLIGHT = 2
+
+ID_COLUMNS = ('id', 'shipment_id')
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 't')
+
+def _number(value, default=0):
+    if value is None or value == '':
+        return default
+    return float(value)
+
+def _flag(value):
+    if isinstance(value, str):
+        return value.strip().lower() in TRUE_VALUES
+    return bool(value)
+
+def row_to_report_input(row):
+    """
+    Convert one table row into generate_insight_report's input
+
+    Nested rows (with a demand_forecast key) are passed through unchanged.
+    """
+    if 'demand_forecast' in row:
+        return row
+    factors = row.get('top_factors') or []
+    if isinstance(factors, str):
+        factors = [factor.strip() for factor in factors.split(';') if factor.strip()]
+    anomaly_status = {'anomaly': _flag(row.get('anomaly', False)), 'score': _number(row.get('anomaly_score'))}
+    if row.get('severity'):
+        anomaly_status['severity'] = row['severity']
+    return {
+        'demand_forecast': {
+            'growth_percentage': _number(row.get('growth_percentage')),
+            'confidence': _number(row.get('confidence'))
+        },
+        'anomaly_status': anomaly_status,
+        'risk_level': row.get('risk_level') or 'UNKNOWN',
+        'risk_probability': _number(row.get('risk_probability')),
+        'top_factors': factors
+    }
+
+class InvalidLine:
+    """A JSON line that is not a JSON object; rendered as that row's error"""
+
+    def __init__(self, line, error):
+        self.line = line
+        self.error = error
+
+def _row_id(row, index):
+    if isinstance(row, dict):
+        for column in ID_COLUMNS:
+            if row.get(column) not in (None, ''):
+                return row[column]
+    return index
+
+def render_chunk(chunk, fmt):
+    """
+    Render a chunk of (index, row) pairs into one block of output text
+
+    Returns:
+        (text, reports, errors)
+    """
+    parts = []
+    errors = 0
+    for index, row in chunk:
+        row_id = _row_id(row, index)
+        try:
+            if isinstance(row, InvalidLine):
+                raise ValueError(row.error)
+            report_input = row_to_report_input(row)
+            if fmt == 'json':
+                parts.append(json.dumps({'id': row_id, 'report': build_insight_report(report_input)}) + "\n")
+            else:
+                parts.append(f"Shipment: {row_id}\n{generate_insight_report(report_input)}\n\n")
+        except Exception as e:
+            errors += 1
+            if fmt == 'json':
+                record = {'id': row_id, 'error': str(e)}
+                if isinstance(row, InvalidLine):
+                    record['line'] = row.line
+                parts.append(json.dumps(record) + "\n")
+            else:
+                print(f"Report skipped for {row_id}: {e}", file=sys.stderr)
+    return "".join(parts), len(chunk) - errors, errors
+
+def iter_rows(source, input_format=None):
+    """
+    Yield rows from a CSV or JSON-lines file ('-' reads stdin) without loading it whole
+
+    A JSON line that does not parse to an object is yielded as an InvalidLine,
+    so it becomes one row's error instead of ending the batch.
+    """
+    if input_format is None:
+        input_format = 'csv' if str(source).endswith('.csv') else 'jsonl'
+    stream = sys.stdin if source == '-' else open(source, 'r', newline='')
+    try:
+        if input_format == 'csv':
+            yield from csv.DictReader(stream)
+        else:
+            for number, line in enumerate(stream, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    row = InvalidLine(number, f"line {number}: invalid JSON ({e})")
+                if not isinstance(row, (dict, InvalidLine)):
+                    row = InvalidLine(number, f"line {number}: expected a JSON object, got {type(row).__name__}")
+                yield row
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+def iter_chunks(rows, chunk_size):
+    chunk = []
+    for index, row in enumerate(rows):
+        chunk.append((index, row))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def generate_batch_reports(rows, out, fmt='text', workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Render reports for every row and write them to out in input order
+
+    Args:
+        rows: Iterable of row dicts (see iter_rows)
+        out: Writable text stream
+        fmt: 'text' for the text reports, 'json' for one structured report per line
+        workers: Worker processes (default: all cores); 1 renders in this process
+        chunk_size: Rows sent to a worker at a time
+
+    Returns:
+        Dictionary with reports, errors and seconds
+    """
+    if fmt not in ('text', 'json'):
+        raise ValueError(f"Unknown report format: {fmt}")
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    reports = errors = 0
+    chunks = iter_chunks(rows, chunk_size)
+
+    if workers == 1:
+        for chunk in chunks:
+            text, ok, failed = render_chunk(chunk, fmt)
+            out.write(text)
+            reports, errors = reports + ok, errors + failed
+    else:
+        # Pool.imap reads its whole input up front, so keep a bounded window
+        # of pending chunks and write them back in order as they finish
+        with Pool(workers) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.apply_async(render_chunk, (chunk, fmt)))
+                if len(pending) >= workers * CHUNKS_IN_FLIGHT:
+                    text, ok, failed = pending.popleft().get()
+                    out.write(text)
+                    reports, errors = reports + ok, errors + failed
+            while pending:
+                text, ok, failed = pending.popleft().get()
+                out.write(text)
+                reports, errors = reports + ok, errors + failed
+
+    out.flush()
+    return {'reports': reports, 'errors': errors, 'seconds': time.perf_counter() - start}
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate insight reports for a table of shipments")
+    parser.add_argument('source', help="CSV or JSON-lines file, or '-' for JSON lines on stdin")
+    parser.add_argument('-o', '--output', help="Output file (default: stdout)")
+    parser.add_argument('--format', choices=['text', 'json'], default='text')
+    parser.add_argument('--input-format', choices=['csv', 'jsonl'], help="Default: from the file extension")
+    parser.add_argument('--workers', type=int, default=0, help="Worker processes (0 = all cores)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        stats = generate_batch_reports(iter_rows(args.source, args.input_format), out,
+                                       fmt=args.format, workers=args.workers or None, chunk_size=args.chunk_size)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    rate = stats['reports'] / stats['seconds'] if stats['seconds'] > 0 else 0
+    print(f"✓ {stats['reports']} reports written in {stats['seconds']:.2f}s ({rate:,.0f}/s), "
+          f"{stats['errors']} errors", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+"""
+Training Data Loader
+Reads the shipment history CSV in chunks with compact dtypes and caches it
+as one .npy file per column, so later runs memory-map the columns instead of
+parsing the CSV again
+
+Numeric columns are stored as float32 and product as int32 codes into a
+category list; listed columns the CSV lacks are skipped and only raise once
+a trainer asks for them. Trainers consume the cache in chunks (estimators with
+partial_fit) or through a bounded random sample (estimators without it).
+
+Usage:
+    python ai-engine/scripts/data_loader.py [csv_path] [--refresh]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+
+import numpy as np
+
+DATA_PATH = 'ai-engine/data/sample_data.csv'
+CACHE_DIR = 'ai-engine/data/cache'
+
+# Explicit compact dtypes; columns not listed here (or not in the CSV) are not cached
+NUMERIC_COLUMNS = ['quantity', 'price', 'demand', 'delay_days', 'temperature', 'stock_level']
+CATEGORY_COLUMNS = ['product']
+NUMERIC_DTYPE = np.float32
+CODE_DTYPE = np.int32
+
+CSV_CHUNK_SIZE = 200000
+TRAIN_CHUNK_SIZE = 100000
+
+# Estimators without partial_fit train on at most this many rows
+MAX_SAMPLE_ROWS = 500000
+
+FORMAT_VERSION = 1
+
+def cache_dir(path):
+    """
+    Cache directory of a CSV file: its name plus a hash of its absolute path,
+    so same-named files in different directories get separate caches
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    digest = hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:8]
+    return os.path.join(CACHE_DIR, f"{name}-{digest}")
+
+def _source_signature(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def csv_columns(path):
+    """(numeric, category) columns of NUMERIC_COLUMNS and CATEGORY_COLUMNS present in the CSV"""
+    import pandas as pd
+    header = set(pd.read_csv(path, nrows=0).columns)
+    return ([name for name in NUMERIC_COLUMNS if name in header],
+            [name for name in CATEGORY_COLUMNS if name in header])
+
+def iter_csv_chunks(path=DATA_PATH, chunksize=CSV_CHUNK_SIZE):
+    """Yield DataFrame chunks of the CSV's cached columns with the compact dtypes applied"""
+    import pandas as pd
+    numeric_columns, category_columns = csv_columns(path)
+    dtype = {name: NUMERIC_DTYPE for name in numeric_columns}
+    dtype.update({name: 'category' for name in category_columns})
+    yield from pd.read_csv(path, usecols=numeric_columns + category_columns, dtype=dtype, chunksize=chunksize)
+
+def build_cache(path=DATA_PATH, chunksize=CSV_CHUNK_SIZE):
+    """
+    Parse the CSV chunk by chunk into a columnar .npy cache
+
+    Only one chunk is held in memory at a time. Columns are appended to raw
+    files while the row count is unknown, then copied into .npy files.
+
+    Returns:
+        The cache metadata that was written
+    """
+    directory = cache_dir(path)
+    # Per-process build directory: parallel training steps may build at once
+    build_dir = f"{directory}.{os.getpid()}.building"
+    shutil.rmtree(build_dir, ignore_errors=True)
+    os.makedirs(build_dir)
+    started_at = time.time()
+
+    signature = _source_signature(path)
+    numeric_columns, category_columns = csv_columns(path)
+    names = numeric_columns + category_columns
+    raw_files = {name: open(os.path.join(build_dir, name + '.raw'), 'wb') for name in names}
+    categories = {name: {} for name in category_columns}
+    rows = 0
+
+    try:
+        for chunk in iter_csv_chunks(path, chunksize):
+            for name in numeric_columns:
+                # Missing values become 0, as in the trainers' fillna(0)
+                values = chunk[name].to_numpy(dtype=NUMERIC_DTYPE, na_value=0)
+                values.tofile(raw_files[name])
+            for name in category_columns:
+                # Chunk-local categories mapped onto one growing category list
+                column = chunk[name]
+                lookup = categories[name]
+                for category in column.cat.categories:
+                    lookup.setdefault(str(category), len(lookup))
+                mapping = np.array([lookup[str(category)] for category in column.cat.categories] + [-1],
+                                   dtype=CODE_DTYPE)
+                mapping[column.cat.codes.to_numpy()].tofile(raw_files[name])
+            rows += len(chunk)
+    finally:
+        for f in raw_files.values():
+            f.close()
+
+    columns = {}
+    for name in names:
+        dtype = NUMERIC_DTYPE if name in numeric_columns else CODE_DTYPE
+        raw_path = os.path.join(build_dir, name + '.raw')
+        npy_name = name + '.npy'
+        target = np.lib.format.open_memmap(os.path.join(build_dir, npy_name), mode='w+', dtype=dtype, shape=(rows,))
+        source = np.memmap(raw_path, dtype=dtype, mode='r', shape=(rows,)) if rows else np.empty(0, dtype=dtype)
+        for offset in range(0, rows, CSV_CHUNK_SIZE):
+            target[offset:offset + CSV_CHUNK_SIZE] = source[offset:offset + CSV_CHUNK_SIZE]
+        target.flush()
+        del target, source
+        os.remove(raw_path)
+        columns[name] = {'file': npy_name, 'dtype': np.dtype(dtype).name}
+
+    meta = {
+        'format_version': FORMAT_VERSION,
+        'source': path,
+        'source_signature': signature,
+        'rows': rows,
+        'columns': columns,
+        'categories': {name: list(lookup) for name, lookup in categories.items()},
+        'built_at': time.time()
+    }
+    with open(os.path.join(build_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    # Swap the finished cache in whole, so readers never see a partial one
+    try:
+        os.replace(build_dir, directory)
+        return meta
+    except OSError:
+        pass
+    current = _cached_meta(path)
+    if current is not None and current['built_at'] >= started_at:
+        # Another process built the same cache while this one was building
+        shutil.rmtree(build_dir, ignore_errors=True)
+        return current
+    # Replace the stale cache; open memory maps of it stay valid
+    stale_dir = f"{directory}.{os.getpid()}.stale"
+    os.replace(directory, stale_dir)
+    os.replace(build_dir, directory)
+    shutil.rmtree(stale_dir, ignore_errors=True)
+    return meta
+
+def _cached_meta(path):
+    meta_path = os.path.join(cache_dir(path), 'meta.json')
+    try:
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('format_version') != FORMAT_VERSION or meta.get('source_signature') != _source_signature(path):
+        return None
+    return meta
+
+class ColumnarData:
+    """Memory-mapped columns of a cached CSV"""
+
+    def __init__(self, directory, meta):
+        self.directory = directory
+        self.meta = meta
+        self.rows = meta['rows']
+        self.categories = meta['categories']
+        self.fingerprint = '{size}-{mtime_ns}-{rows}'.format(rows=self.rows, **meta['source_signature'])
+        self._columns = {}
+
+    def column(self, name):
+        """One column as a read-only memory-mapped array (product as int32 codes)"""
+        if name not in self._columns:
+            info = self.meta['columns'].get(name)
+            if info is None:
+                raise KeyError(f"Column '{name}' is not in {self.meta['source']}")
+            self._columns[name] = np.load(os.path.join(self.directory, info['file']), mmap_mode='r')
+        return self._columns[name]
+
+    def matrix(self, columns, rows=None):
+        """
+        Float64 feature matrix of the given columns
+
+        Args:
+            columns: Column names, in feature order
+            rows: Optional slice or index array; all rows by default
+        """
+        selection = slice(None) if rows is None else rows
+        X = np.empty((len(self.column(columns[0])[selection]), len(columns)), dtype=np.float64)
+        for j, name in enumerate(columns):
+            X[:, j] = self.column(name)[selection]
+        return X
+
+    def iter_chunks(self, columns, chunk_size=TRAIN_CHUNK_SIZE):
+        """Yield float64 matrices of chunk_size consecutive rows"""
+        for start in range(0, self.rows, chunk_size):
+            yield self.matrix(columns, slice(start, start + chunk_size))
+
+    def sample_rows(self, max_rows=MAX_SAMPLE_ROWS, random_state=42, rows=None):
+        """
+        Indices of a bounded uniform random sample, in file order
+
+        When everything fits, all rows are returned, so small files train
+        exactly as they would without sampling.
+
+        Args:
+            max_rows: Sample size bound
+            random_state: Seed of the sample
+            rows: Optional index array to sample from (e.g. one product's rows)
+        """
+        rows = np.arange(self.rows) if rows is None else np.asarray(rows)
+        if len(rows) <= max_rows:
+            return rows
+        chosen = np.random.RandomState(random_state).choice(len(rows), max_rows, replace=False)
+        return rows[np.sort(chosen)]
+
+    def category_rows(self, name, category):
+        """Indices of the rows whose category column equals category"""
+        column = self.column(name)
+        codes = self.meta['categories'][name]
+        if category not in codes:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(column == codes.index(category))
+
+def load_dataset(path=DATA_PATH, refresh=False):
+    """
+    Open the columnar cache of a CSV, building it first if missing or stale
+
+    The cache is rebuilt when the CSV's size or modification time changes.
+    """
+    meta = None if refresh else _cached_meta(path)
+    if meta is None:
+        meta = build_cache(path)
+    return ColumnarData(cache_dir(path), meta)
+
+def fit_scaler(dataset, columns, chunk_size=TRAIN_CHUNK_SIZE):
+    """StandardScaler fitted chunk by chunk with partial_fit"""
+    from sklearn.preprocessing import StandardScaler
+    scaler = StandardScaler()
+    for X in dataset.iter_chunks(columns, chunk_size):
+        scaler.partial_fit(X)
+    return scaler
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the columnar cache of a training CSV")
+    parser.add_argument('path', nargs='?', default=DATA_PATH)
+    parser.add_argument('--refresh', action='store_true', help="Rebuild even if the cache is current")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    dataset = load_dataset(args.path, refresh=args.refresh)
+    print(json.dumps({'rows': dataset.rows, 'columns': list(dataset.meta['columns']),
+                      'categories': dataset.categories, 'dir': dataset.directory}))
+    print(f"✓ {dataset.rows} rows cached in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Feature Engineering
+One feature pipeline for training and inference: calendar features for the
+demand models and rule-based risk labels, with computed training matrices
+cached on disk keyed by a fingerprint of their input data
+
+Calendar features are computed from datetime64 values with NumPy only, so
+the forecast path does not import pandas.
+"""
+
+import os
+import re
+import shutil
+import hashlib
+
+import numpy as np
+
+FEATURE_CACHE_DIR = 'ai-engine/data/features'
+
+# The demand history starts here; forecasts continue from its last day
+DEMAND_START = '2023-01-01'
+DEMAND_HISTORY_DAYS = 365
+CALENDAR_FEATURES = ['day_of_year', 'month', 'day_of_week']
+
+def demand_dates(start_day, stop_day, origin=DEMAND_START):
+    """Dates of demand days [start_day, stop_day), counted from origin"""
+    return np.datetime64(origin, 'D') + np.arange(start_day, stop_day)
+
+def calendar_features(dates):
+    """
+    day_of_year (1-366), month (1-12) and day_of_week (Monday=0) per date
+
+    Returns:
+        int64 matrix with the columns of CALENDAR_FEATURES
+    """
+    days = np.asarray(dates, dtype='datetime64[D]')
+    years = days.astype('datetime64[Y]')
+    day_of_year = (days - years.astype('datetime64[D]')).astype(np.int64) + 1
+    month = (days.astype('datetime64[M]') - years.astype('datetime64[M]')).astype(np.int64) + 1
+    # 1970-01-01 was a Thursday
+    day_of_week = (days.astype(np.int64) + 3) % 7
+    return np.column_stack([day_of_year, month, day_of_week])
+
+def future_calendar_features(start, stop):
+    """Calendar features of forecast days [start, stop) after the demand history"""
+    return calendar_features(demand_dates(DEMAND_HISTORY_DAYS + start, DEMAND_HISTORY_DAYS + stop))
+
+def risk_labels(columns):
+    """
+    Rule-based risk labels (0 = low, 1 = high)
+
+    Args:
+        columns: DataFrame or dict of arrays with delay_days, temperature,
+                 stock_level and demand
+    """
+    # Risk factors: high delay, extreme temperature, low stock
+    risk_score = (
+        (columns['delay_days'] > 3).astype(int) * 0.4 +
+        ((columns['temperature'] < 15) | (columns['temperature'] > 30)).astype(int) * 0.3 +
+        (columns['stock_level'] < columns['demand'] * 0.5).astype(int) * 0.3
+    )
+    return (risk_score > 0.5).astype(int)
+
+def fingerprint(*parts):
+    """Short content hash of arrays and strings"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            digest.update(part.encode())
+        else:
+            array = np.ascontiguousarray(part)
+            digest.update(str(array.dtype).encode() + str(array.shape).encode())
+            digest.update(array.tobytes())
+        digest.update(b'\0')
+    return digest.hexdigest()[:16]
+
+def cached_arrays(name, key, build):
+    """
+    Arrays built by build(), cached under FEATURE_CACHE_DIR/<name>-<key>/
+
+    Cached arrays are memory-mapped read-only. Only the latest key of each
+    name is kept.
+
+    Args:
+        name: Feature set name
+        key: Fingerprint of everything the arrays depend on
+        build: Function returning a dict of arrays
+
+    Returns:
+        Dict of arrays
+    """
+    directory = os.path.join(FEATURE_CACHE_DIR, f"{name}-{key}")
+    if os.path.isdir(directory):
+        return {
+            file_name[:-len('.npy')]: np.load(os.path.join(directory, file_name), mmap_mode='r')
+            for file_name in sorted(os.listdir(directory))
+        }
+
+    arrays = build()
+    os.makedirs(FEATURE_CACHE_DIR, exist_ok=True)
+    tmp_dir = f"{directory}.{os.getpid()}.tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+    for array_name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, array_name + '.npy'), np.asarray(array))
+    try:
+        os.replace(tmp_dir, directory)
+    except OSError:
+        # Another process cached the same key first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    # Drop stale entries of this feature set only: exactly <name>-<16 hex>,
+    # so e.g. 'risk_A' does not match 'risk_A-B-<key>'
+    stale = re.compile(re.escape(name) + r'-[0-9a-f]{16}')
+    for entry in os.listdir(FEATURE_CACHE_DIR):
+        if stale.fullmatch(entry) and entry != f"{name}-{key}":
+            shutil.rmtree(os.path.join(FEATURE_CACHE_DIR, entry), ignore_errors=True)
+    return arrays
+
+def demand_training_features(dates):
+    """Cached calendar feature matrix of the demand history dates"""
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    return cached_arrays('demand_calendar', fingerprint(dates),
+                         lambda: {'X': calendar_features(dates)})['X']
+
+def risk_training_arrays(dataset, rows, features, name='risk'):
+    """
+    Cached feature matrix and risk labels for rows of a data_loader dataset
+
+    Keyed by the dataset's fingerprint and the selected rows, so repeated
+    training runs on unchanged data skip the feature work. Use a distinct
+    name per row selection that should stay cached side by side.
+    """
+    rows = np.asarray(rows)
+    key = fingerprint(dataset.fingerprint, rows, ','.join(features))
+
+    def build():
+        X = dataset.matrix(features, rows)
+        return {'X': X, 'y': risk_labels(dict(zip(features, X.T)))}
+
+    arrays = cached_arrays(name, key, build)
+    return arrays['X'], arrays['y']
@@ -6,215 +6,243 @@ Generates professional business insights from AI predictions
 import sys
 import json
 
-def generate_insight_report(data_dict):
-    """
-    Generate comprehensive business insight report
-    
-    Args:
-        data_dict: Dictionary containing:
-            - demand_forecast: dict with growth_percentage, confidence
-            - anomaly_status: dict with anomaly, score
-            - risk_level: str (LOW/MEDIUM/HIGH)
-            - risk_probability: float
-            - top_factors: list of risk factors
-    
-    Returns:
-        Professional multi-line business report
-    """
-    
-    # Extract data
-    demand_forecast = data_dict.get('demand_forecast', {})
-    anomaly_status = data_dict.get('anomaly_status', {})
-    risk_level = data_dict.get('risk_level', 'UNKNOWN')
-    risk_probability = data_dict.get('risk_probability', 0)
-    top_factors = data_dict.get('top_factors', [])
-    
-    growth_pct = demand_forecast.get('growth_percentage', 0)
-    confidence = demand_forecast.get('confidence', 0)
-    is_anomaly = anomaly_status.get('anomaly', False)
-    anomaly_score = anomaly_status.get('score', 0)
-    
-    # Build report sections
-    report_lines = []
-    
-    # Header
-    report_lines.append("=" * 80)
-    report_lines.append("AI-GENERATED SUPPLY CHAIN INTELLIGENCE REPORT")
-    report_lines.append("=" * 80)
-    report_lines.append("")
-    
-    # 1. Demand Forecast Section
-    report_lines.append("📊 DEMAND FORECAST ANALYSIS")
-    report_lines.append("-" * 80)
-    
+# Static report text, built once at import
+RULE = "-" * 80
+BANNER = "=" * 80
+HEADER_LINES = (BANNER, "AI-GENERATED SUPPLY CHAIN INTELLIGENCE REPORT", BANNER, "")
+FOOTER_LINES = (BANNER, "Report generated by AGR·CHAIN AI Intelligence Engine", BANNER)
+
+SECTION_TITLES = {
+    'demand_forecast': "📊 DEMAND FORECAST ANALYSIS",
+    'anomaly_detection': "🔍 ANOMALY DETECTION STATUS",
+    'risk_assessment': "⚡ RISK ASSESSMENT",
+    'recommendations': "💡 STRATEGIC RECOMMENDATIONS",
+    'kpis': "📈 KEY PERFORMANCE INDICATORS",
+    'next_steps': "🎯 IMMEDIATE NEXT STEPS (Priority Order)",
+}
+
+ANOMALY_ACTION_LINES = (
+    "",
+    "Recommended Actions:",
+    "  • Investigate recent transactions for irregularities",
+    "  • Verify temperature and handling compliance",
+    "  • Review supplier and distributor performance",
+)
+NO_ANOMALY_LINES = (
+    "✓ NO ANOMALIES DETECTED",
+    "All recent shipments are within normal operational parameters.",
+    "Supply chain operations are functioning as expected.",
+)
+FACTOR_ACTIONS = (
+    ('delay_days', "  • Address delivery delays - review logistics and routes"),
+    ('temperature', "  • Investigate temperature control issues - check cold chain"),
+    ('stock_level', "  • Replenish inventory immediately - prevent stockouts"),
+    ('demand', "  • Adjust supply planning - align with demand fluctuations"),
+)
+MEDIUM_RISK_ACTION_LINES = (
+    "",
+    "Recommended Actions:",
+    "  • Increase monitoring frequency for flagged parameters",
+    "  • Prepare contingency plans for potential disruptions",
+    "  • Review and optimize current operational procedures",
+)
+LOW_RISK_LINES = (
+    "",
+    "✓ LOW RISK - Operations within acceptable parameters",
+    "",
+    "Maintain current operational standards and continue routine monitoring.",
+)
+RISK_RECOMMENDATIONS = {
+    "HIGH": ("IMPLEMENT emergency response protocols immediately",
+             "ESCALATE to senior management for strategic intervention"),
+    "MEDIUM": ("REINFORCE monitoring protocols and inspection frequency",
+               "PREPARE backup suppliers and alternative routes"),
+}
+LOW_RISK_RECOMMENDATIONS = ("CONTINUE standard operations with routine monitoring",)
+ANOMALY_RECOMMENDATIONS = ("CONDUCT thorough audit of flagged transactions",
+                           "VERIFY blockchain integrity and data authenticity")
+STANDARD_RECOMMENDATIONS = ("MAINTAIN temperature compliance across all shipments (15°C - 30°C)",
+                            "ENSURE blockchain verification for all transactions")
+STANDARD_NEXT_STEPS = ("Review and optimize logistics for cost efficiency",
+                       "Conduct routine blockchain verification and compliance checks")
+
+# Display names of risk factors, filled on first use
+_FACTOR_LABELS = {}
+
+def _factor_label(factor):
+    label = _FACTOR_LABELS.get(factor)
+    if label is None:
+        label = _FACTOR_LABELS[factor] = factor.replace('_', ' ').title()
+    return label
+
+def _demand_lines(growth_pct, confidence):
     if growth_pct > 0:
-        report_lines.append(f"Demand is projected to INCREASE by {abs(growth_pct):.1f}% over the next 30 days.")
+        lines = [f"Demand is projected to INCREASE by {abs(growth_pct):.1f}% over the next 30 days."]
         if growth_pct > 15:
-            report_lines.append("⚠️  ALERT: Significant demand surge expected. Immediate action required.")
+            lines.append("⚠️  ALERT: Significant demand surge expected. Immediate action required.")
         elif growth_pct > 10:
-            report_lines.append("📈 Moderate growth anticipated. Prepare for increased orders.")
+            lines.append("📈 Moderate growth anticipated. Prepare for increased orders.")
         else:
-            report_lines.append("✓ Steady growth pattern detected. Normal operations recommended.")
+            lines.append("✓ Steady growth pattern detected. Normal operations recommended.")
     elif growth_pct < 0:
-        report_lines.append(f"Demand is projected to DECREASE by {abs(growth_pct):.1f}% over the next 30 days.")
+        lines = [f"Demand is projected to DECREASE by {abs(growth_pct):.1f}% over the next 30 days."]
         if abs(growth_pct) > 15:
-            report_lines.append("⚠️  ALERT: Significant demand drop expected. Review inventory levels.")
+            lines.append("⚠️  ALERT: Significant demand drop expected. Review inventory levels.")
         else:
-            report_lines.append("📉 Slight decline anticipated. Monitor market conditions.")
+            lines.append("📉 Slight decline anticipated. Monitor market conditions.")
     else:
-        report_lines.append("Demand is projected to remain STABLE over the next 30 days.")
-    
-    report_lines.append(f"Forecast Confidence: {confidence:.0f}%")
-    report_lines.append("")
-    
-    # 2. Anomaly Detection Section
-    report_lines.append("🔍 ANOMALY DETECTION STATUS")
-    report_lines.append("-" * 80)
-    
-    if is_anomaly:
-        severity = anomaly_status.get('severity', 'MEDIUM')
-        report_lines.append(f"⚠️  ANOMALY DETECTED - Severity: {severity}")
-        report_lines.append("Unusual patterns identified in recent shipment data.")
-        report_lines.append(f"Anomaly Score: {anomaly_score:.3f} (lower values indicate higher anomaly)")
-        report_lines.append("")
-        report_lines.append("Recommended Actions:")
-        report_lines.append("  • Investigate recent transactions for irregularities")
-        report_lines.append("  • Verify temperature and handling compliance")
-        report_lines.append("  • Review supplier and distributor performance")
-    else:
-        report_lines.append("✓ NO ANOMALIES DETECTED")
-        report_lines.append("All recent shipments are within normal operational parameters.")
-        report_lines.append("Supply chain operations are functioning as expected.")
-    
-    report_lines.append("")
-    
-    # 3. Risk Assessment Section
-    report_lines.append("⚡ RISK ASSESSMENT")
-    report_lines.append("-" * 80)
-    
-    report_lines.append(f"Current Risk Level: {risk_level}")
-    report_lines.append(f"Risk Probability: {risk_probability:.1%}")
-    
+        lines = ["Demand is projected to remain STABLE over the next 30 days."]
+    lines.append(f"Forecast Confidence: {confidence:.0f}%")
+    return lines
+
+def _anomaly_lines(is_anomaly, severity, anomaly_score):
+    if not is_anomaly:
+        return list(NO_ANOMALY_LINES)
+    return [
+        f"⚠️  ANOMALY DETECTED - Severity: {severity}",
+        "Unusual patterns identified in recent shipment data.",
+        f"Anomaly Score: {anomaly_score:.3f} (lower values indicate higher anomaly)",
+        *ANOMALY_ACTION_LINES
+    ]
+
+def _risk_lines(risk_level, risk_pct, top_factors):
+    lines = [f"Current Risk Level: {risk_level}", f"Risk Probability: {risk_pct}"]
     if risk_level == "HIGH":
-        report_lines.append("")
-        report_lines.append("🚨 HIGH RISK ALERT - Immediate intervention required!")
-        report_lines.append("")
-        report_lines.append("Critical Risk Factors:")
-        for i, factor in enumerate(top_factors[:3], 1):
-            report_lines.append(f"  {i}. {factor.replace('_', ' ').title()}")
-        report_lines.append("")
-        report_lines.append("Urgent Actions Required:")
-        if 'delay_days' in top_factors:
-            report_lines.append("  • Address delivery delays - review logistics and routes")
-        if 'temperature' in top_factors:
-            report_lines.append("  • Investigate temperature control issues - check cold chain")
-        if 'stock_level' in top_factors:
-            report_lines.append("  • Replenish inventory immediately - prevent stockouts")
-        if 'demand' in top_factors:
-            report_lines.append("  • Adjust supply planning - align with demand fluctuations")
-            
+        lines += ["", "🚨 HIGH RISK ALERT - Immediate intervention required!", "", "Critical Risk Factors:"]
+        lines += [f"  {i}. {_factor_label(factor)}" for i, factor in enumerate(top_factors[:3], 1)]
+        lines += ["", "Urgent Actions Required:"]
+        lines += [action for factor, action in FACTOR_ACTIONS if factor in top_factors]
     elif risk_level == "MEDIUM":
-        report_lines.append("")
-        report_lines.append("⚠️  MODERATE RISK - Proactive monitoring recommended")
-        report_lines.append("")
-        report_lines.append("Key Risk Factors:")
-        for i, factor in enumerate(top_factors[:3], 1):
-            report_lines.append(f"  {i}. {factor.replace('_', ' ').title()}")
-        report_lines.append("")
-        report_lines.append("Recommended Actions:")
-        report_lines.append("  • Increase monitoring frequency for flagged parameters")
-        report_lines.append("  • Prepare contingency plans for potential disruptions")
-        report_lines.append("  • Review and optimize current operational procedures")
-        
+        lines += ["", "⚠️  MODERATE RISK - Proactive monitoring recommended", "", "Key Risk Factors:"]
+        lines += [f"  {i}. {_factor_label(factor)}" for i, factor in enumerate(top_factors[:3], 1)]
+        lines += MEDIUM_RISK_ACTION_LINES
     else:  # LOW
-        report_lines.append("")
-        report_lines.append("✓ LOW RISK - Operations within acceptable parameters")
-        report_lines.append("")
-        report_lines.append("Maintain current operational standards and continue routine monitoring.")
-    
-    report_lines.append("")
-    
-    # 4. Strategic Recommendations
-    report_lines.append("💡 STRATEGIC RECOMMENDATIONS")
-    report_lines.append("-" * 80)
-    
-    recommendations = []
-    
+        lines += LOW_RISK_LINES
+    return lines
+
+def _recommendations(growth_pct, risk_level, is_anomaly):
     # Inventory recommendations based on demand
     if growth_pct > 15:
-        recommendations.append(f"• INCREASE buffer stock by {min(int(growth_pct * 1.2), 25)}% to meet projected demand surge")
+        recommendations = [f"INCREASE buffer stock by {min(int(growth_pct * 1.2), 25)}% to meet projected demand surge"]
     elif growth_pct > 5:
-        recommendations.append(f"• ADJUST inventory levels by {int(growth_pct)}% to align with demand growth")
+        recommendations = [f"ADJUST inventory levels by {int(growth_pct)}% to align with demand growth"]
     elif growth_pct < -10:
-        recommendations.append(f"• REDUCE inventory by {min(abs(int(growth_pct)), 20)}% to prevent overstocking")
-    else:
-        recommendations.append("• MAINTAIN current inventory levels - demand stable")
-    
-    # Risk-based recommendations
-    if risk_level == "HIGH":
-        recommendations.append("• IMPLEMENT emergency response protocols immediately")
-        recommendations.append("• ESCALATE to senior management for strategic intervention")
-    elif risk_level == "MEDIUM":
-        recommendations.append("• REINFORCE monitoring protocols and inspection frequency")
-        recommendations.append("• PREPARE backup suppliers and alternative routes")
+        recommendations = [f"REDUCE inventory by {min(abs(int(growth_pct)), 20)}% to prevent overstocking"]
     else:
-        recommendations.append("• CONTINUE standard operations with routine monitoring")
+        recommendations = ["MAINTAIN current inventory levels - demand stable"]
     
-    # Anomaly-based recommendations
+    # Risk, anomaly and quality recommendations
+    recommendations += RISK_RECOMMENDATIONS.get(risk_level, LOW_RISK_RECOMMENDATIONS)
     if is_anomaly:
-        recommendations.append("• CONDUCT thorough audit of flagged transactions")
-        recommendations.append("• VERIFY blockchain integrity and data authenticity")
-    
-    # Quality recommendations
-    recommendations.append("• MAINTAIN temperature compliance across all shipments (15°C - 30°C)")
-    recommendations.append("• ENSURE blockchain verification for all transactions")
-    
-    for rec in recommendations:
-        report_lines.append(rec)
-    
-    report_lines.append("")
-    
-    # 5. Performance Metrics
-    report_lines.append("📈 KEY PERFORMANCE INDICATORS")
-    report_lines.append("-" * 80)
-    report_lines.append(f"Forecast Accuracy:        {confidence:.0f}%")
-    report_lines.append(f"Risk Assessment:          {risk_level} ({risk_probability:.1%})")
-    report_lines.append(f"Anomaly Status:           {'DETECTED' if is_anomaly else 'CLEAR'}")
-    report_lines.append(f"Operational Health:       {calculate_health_score(growth_pct, risk_probability, is_anomaly)}")
-    report_lines.append("")
-    
-    # 6. Next Steps
-    report_lines.append("🎯 IMMEDIATE NEXT STEPS (Priority Order)")
-    report_lines.append("-" * 80)
-    
+        recommendations += ANOMALY_RECOMMENDATIONS
+    recommendations += STANDARD_RECOMMENDATIONS
+    return recommendations
+
+def _next_steps(growth_pct, risk_level, is_anomaly, top_factors):
     next_steps = []
-    priority = 1
-    
     if risk_level == "HIGH":
-        next_steps.append(f"{priority}. Address high-risk factors: {', '.join(top_factors[:2])}")
-        priority += 1
-    
+        next_steps.append(f"Address high-risk factors: {', '.join(top_factors[:2])}")
     if is_anomaly:
-        next_steps.append(f"{priority}. Investigate detected anomalies in supply chain data")
-        priority += 1
-    
+        next_steps.append("Investigate detected anomalies in supply chain data")
     if abs(growth_pct) > 10:
-        next_steps.append(f"{priority}. Adjust inventory and procurement based on {abs(growth_pct):.1f}% demand change")
-        priority += 1
+        next_steps.append(f"Adjust inventory and procurement based on {abs(growth_pct):.1f}% demand change")
+    next_steps += STANDARD_NEXT_STEPS
+    return next_steps
+
+def _report_content(data_dict):
+    """Summary fields and (key, lines) sections shared by the text and JSON forms"""
+    # Extract data
+    demand_forecast = data_dict.get('demand_forecast', {})
+    anomaly_status = data_dict.get('anomaly_status', {})
+    risk_level = data_dict.get('risk_level', 'UNKNOWN')
+    risk_probability = data_dict.get('risk_probability', 0)
+    top_factors = data_dict.get('top_factors', [])
+    
+    growth_pct = demand_forecast.get('growth_percentage', 0)
+    confidence = demand_forecast.get('confidence', 0)
+    is_anomaly = anomaly_status.get('anomaly', False)
+    anomaly_score = anomaly_status.get('score', 0)
+    severity = anomaly_status.get('severity', 'MEDIUM') if is_anomaly else None
+    health_score = calculate_health_score(growth_pct, risk_probability, is_anomaly)
+    risk_pct = f"{risk_probability:.1%}"
+    recommendations = _recommendations(growth_pct, risk_level, is_anomaly)
+    next_steps = _next_steps(growth_pct, risk_level, is_anomaly, top_factors)
+    
+    sections = [
+        ('demand_forecast', _demand_lines(growth_pct, confidence)),
+        ('anomaly_detection', _anomaly_lines(is_anomaly, severity, anomaly_score)),
+        ('risk_assessment', _risk_lines(risk_level, risk_pct, top_factors)),
+        ('recommendations', ["• " + recommendation for recommendation in recommendations]),
+        ('kpis', [
+            f"Forecast Accuracy:        {confidence:.0f}%",
+            f"Risk Assessment:          {risk_level} ({risk_pct})",
+            f"Anomaly Status:           {'DETECTED' if is_anomaly else 'CLEAR'}",
+            f"Operational Health:       {health_score}",
+        ]),
+        ('next_steps', [f"{priority}. {step}" for priority, step in enumerate(next_steps, 1)]),
+    ]
+    summary = {
+        "demand": {
+            "trend": "INCREASE" if growth_pct > 0 else "DECREASE" if growth_pct < 0 else "STABLE",
+            "growth_percentage": growth_pct,
+            "confidence": confidence
+        },
+        "anomaly": {"detected": bool(is_anomaly), "severity": severity, "score": anomaly_score},
+        "risk": {"level": risk_level, "probability": risk_probability, "top_factors": list(top_factors[:3])},
+        "health_score": health_score,
+        "recommendations": recommendations,
+        "next_steps": next_steps
+    }
+    return summary, sections
+
+def _render_sections(sections):
+    lines = list(HEADER_LINES)
+    for key, section_lines in sections:
+        lines.append(SECTION_TITLES[key])
+        lines.append(RULE)
+        lines += section_lines
+        lines.append("")
+    lines += FOOTER_LINES
+    return "\n".join(lines)
+
+def build_insight_report(data_dict):
+    """
+    Build the structured (JSON) form of the insight report
     
-    next_steps.append(f"{priority}. Review and optimize logistics for cost efficiency")
-    priority += 1
-    next_steps.append(f"{priority}. Conduct routine blockchain verification and compliance checks")
+    Args:
+        data_dict: Same input as generate_insight_report
     
-    for step in next_steps:
-        report_lines.append(step)
+    Returns:
+        Dictionary with demand, anomaly, risk, health_score, recommendations
+        and next_steps, plus the titled text sections of the text report
+    """
+    report, sections = _report_content(data_dict)
+    report["sections"] = [
+        {"key": key, "title": SECTION_TITLES[key], "lines": lines}
+        for key, lines in sections
+    ]
+    return report
+
+def render_report_text(report):
+    """Render a structured report (from build_insight_report) as the text report"""
+    return _render_sections([(section['key'], section['lines']) for section in report['sections']])
+
+def generate_insight_report(data_dict):
+    """
+    Generate comprehensive business insight report
     
-    report_lines.append("")
-    report_lines.append("=" * 80)
-    report_lines.append("Report generated by AGR·CHAIN AI Intelligence Engine")
-    report_lines.append("=" * 80)
+    Args:
+        data_dict: Dictionary containing:
+            - demand_forecast: dict with growth_percentage, confidence
+            - anomaly_status: dict with anomaly, score
+            - risk_level: str (LOW/MEDIUM/HIGH)
+            - risk_probability: float
+            - top_factors: list of risk factors
     
-    return "\n".join(report_lines)
+    Returns:
+        Professional multi-line business report
+    """
+    return _render_sections(_report_content(data_dict)[1])
 
 def calculate_health_score(growth_pct, risk_prob, is_anomaly):
     """Calculate overall operational health score"""
@@ -244,12 +272,15 @@ def calculate_health_score(growth_pct, risk_prob, is_anomaly):
 
 if __name__ == "__main__":
     if len(sys.argv) > 1:
-        # CLI mode - receive JSON input
+        # CLI mode - receive JSON input (add --json for the structured form)
         try:
             input_json = sys.argv[1]
             input_data = json.loads(input_json)
-            report = generate_insight_report(input_data)
-            print(report)
+            if '--json' in sys.argv[2:]:
+                print(json.dumps(build_insight_report(input_data)))
+            else:
+                report = generate_insight_report(input_data)
+                print(report)
         except Exception as e:
             print(json.dumps({"error": str(e)}))
     else:
@@ -0,0 +1,178 @@
+"""
+Linear Scorers
+Folds a fitted StandardScaler and linear model into one weight vector and
+bias, saved as JSON and scored with NumPy alone
+
+For a scaler (mean, scale) and coefficients coef, intercept:
+    coef . (x - mean) / scale + intercept == (coef / scale) . x + bias
+with bias = intercept - coef . (mean / scale). Supported: LinearRegression
+(single target) and binary LogisticRegression.
+"""
+
+import os
+import json
+import math
+import numpy as np
+
+FORMAT_VERSION = 1
+
+# Exported scorers must agree with the sklearn model to this tolerance
+TOLERANCE = 1e-9
+
+def fold_linear(coef, intercept, mean=None, scale=None):
+    """
+    Fold scaler statistics into linear coefficients
+
+    Returns:
+        (weights, bias) as a float64 vector and a Python float
+    """
+    weights = np.asarray(coef, dtype=np.float64).ravel()
+    bias = float(np.ravel(intercept)[0]) if np.ndim(intercept) else float(intercept)
+    if scale is not None:
+        weights = weights / np.asarray(scale, dtype=np.float64)
+    if mean is not None:
+        bias -= float(np.dot(weights, np.asarray(mean, dtype=np.float64)))
+    return weights, bias
+
+def from_sklearn(model, scaler=None, features=None, meta=None):
+    """Build a LinearScorer from a fitted LinearRegression or LogisticRegression"""
+    kind = type(model).__name__
+    if kind == 'LinearRegression':
+        if np.ndim(model.coef_) != 1:
+            raise ValueError("Only single-target LinearRegression can be exported")
+        scorer_kind = 'regression'
+    elif kind == 'LogisticRegression':
+        if len(model.classes_) != 2:
+            raise ValueError("Only binary LogisticRegression can be exported")
+        scorer_kind = 'logistic'
+    else:
+        raise ValueError(f"Unsupported model type: {kind}")
+
+    weights, bias = fold_linear(
+        model.coef_, model.intercept_,
+        getattr(scaler, 'mean_', None), getattr(scaler, 'scale_', None)
+    )
+    classes = model.classes_.tolist() if scorer_kind == 'logistic' else None
+    return LinearScorer(weights, bias, scorer_kind, features=features, classes=classes, meta=meta)
+
+def export_linear_model(model, path, scaler=None, X_check=None, features=None, meta=None):
+    """
+    Fold a fitted model (and scaler), verify it and write it as JSON
+
+    Args:
+        model: Fitted LinearRegression or binary LogisticRegression
+        path: Destination, e.g. 'ai-engine/models/risk_scorer.json'
+        scaler: Optional fitted StandardScaler applied before the model
+        X_check: Unscaled rows the exported scorer is checked against
+        features: Optional input column names, stored for reference
+        meta: Optional extra JSON-serializable fields
+
+    Returns:
+        The LinearScorer that was written
+    """
+    scorer = from_sklearn(model, scaler, features, meta)
+    if X_check is not None:
+        X_check = np.asarray(X_check, dtype=np.float64)
+        X_model = scaler.transform(X_check) if scaler is not None else X_check
+        if scorer.kind == 'logistic':
+            expected, actual = model.predict_proba(X_model)[:, 1], scorer.probability(X_check)
+        else:
+            expected, actual = model.predict(X_model), scorer.predict(X_check)
+        error = float(np.max(np.abs(expected - actual))) if len(X_check) else 0.0
+        if not np.allclose(actual, expected, rtol=TOLERANCE, atol=TOLERANCE):
+            raise ValueError(f"Exported scorer for {path} differs from the model (max error {error:.3g})")
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(scorer.to_dict(), f, indent=2)
+    os.replace(tmp_path, path)
+    return scorer
+
+def load_linear_scorer(path):
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if data.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported linear scorer version in {path}")
+    return LinearScorer(data['weights'], data['bias'], data['kind'],
+                        features=data.get('features'), classes=data.get('classes'), meta=data.get('meta'))
+
+class LinearScorer:
+    """
+    x . weights + bias, with the logistic link for classifiers
+
+    The *_row methods score a single row with plain Python floats, which is
+    several times faster than building a NumPy array for one row.
+    """
+
+    def __init__(self, weights, bias, kind, features=None, classes=None, meta=None):
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.kind = kind
+        self.features = features
+        self.classes_ = classes
+        self.meta = meta or {}
+        self.n_features_in_ = len(self.weights)
+        self._row_weights = self.weights.tolist()
+
+    def to_dict(self):
+        data = {
+            'format_version': FORMAT_VERSION,
+            'kind': self.kind,
+            'weights': self._row_weights,
+            'bias': self.bias
+        }
+        if self.features is not None:
+            data['features'] = list(self.features)
+        if self.classes_ is not None:
+            data['classes'] = list(self.classes_)
+        if self.meta:
+            data['meta'] = self.meta
+        return data
+
+    def decision_function(self, X):
+        X = np.asarray(X, dtype=np.float64).reshape(-1, self.n_features_in_)
+        # Accumulated feature by feature in decision_row's order, so batch and
+        # single-row scores are bit-identical
+        total = np.full(len(X), self.bias)
+        for j, weight in enumerate(self._row_weights):
+            total += weight * X[:, j]
+        # A NaN or infinite feature makes its total non-finite; sklearn raises for those
+        if not np.isfinite(total).all():
+            raise ValueError("Input contains NaN or infinity")
+        return total
+
+    def predict(self, X):
+        if self.kind == 'logistic':
+            return np.asarray(self.classes_)[(self.decision_function(X) > 0).astype(int)]
+        return self.decision_function(X)
+
+    def probability(self, X):
+        """Probability of the positive class for every row"""
+        if self.kind != 'logistic':
+            raise AttributeError("probability is only available for logistic scorers")
+        z = self.decision_function(X)
+        # exp(-|z|) never overflows, for large positive or negative z alike
+        e = np.exp(-np.abs(z))
+        return np.where(z >= 0, 1.0 / (1.0 + e), e / (1.0 + e))
+
+    def predict_proba(self, X):
+        p = self.probability(X)
+        return np.column_stack([1.0 - p, p])
+
+    def decision_row(self, row):
+        """Decision value for one row given as a sequence of floats"""
+        total = self.bias
+        for weight, value in zip(self._row_weights, row):
+            total += weight * value
+        if not math.isfinite(total):
+            raise ValueError("Input contains NaN or infinity")
+        return total
+
+    def probability_row(self, row):
+        z = self.decision_row(row)
+        # np.exp rather than math.exp: the two can differ in the last bit,
+        # and batch scores must match single-row scores exactly
+        e = float(np.exp(-abs(z)))
+        if z >= 0:
+            return 1.0 / (1.0 + e)
+        return e / (1.0 + e)
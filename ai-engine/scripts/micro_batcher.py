@@ -0,0 +1,242 @@
+"""
+Micro-Batching Scoring Service
+Gathers concurrent single-row anomaly and risk requests into batches, scores
+each batch with one vectorized call on a thread pool and resolves every
+caller's future with its own row
+
+A batch is dispatched when max_batch rows are waiting or max_wait seconds
+after its first row arrived, whichever comes first. Used by ai_server.py
+with --batch-window-ms.
+
+Batch scorers read missing, None and NaN features as 0, where the single-row
+functions raise or score them differently; such rows are not batched but
+scored with the single-row function, so every result is what the unbatched
+server returns. The same goes for rows whose product has its own model shard
+(see product_models.py), since batches are scored with the global models.
+
+    service = ScoringService(max_batch=256, max_wait=0.002, executor=pool, max_in_flight=4)
+    service.start()
+    result = await service.score('risk', {'demand': 500, ...})
+"""
+
+import math
+import asyncio
+import time
+from functools import partial
+
+import anomaly_detection
+import risk_forecasting
+import product_models
+
+MAX_BATCH = 256
+MAX_WAIT = 0.002
+
+def _risk_rows(rows):
+    """predict_risk_batch's columns split back into predict_risk-shaped dicts"""
+    columns = risk_forecasting.predict_risk_batch(rows)
+    top_factors = columns['top_factors']
+    return [
+        {"risk_probability": probability, "risk_level": level, "top_factors": list(top_factors),
+         "confidence": confidence}
+        for probability, level, confidence in zip(columns['risk_probability'], columns['risk_level'],
+                                                  columns['confidence'])
+    ]
+
+# Per kind: batch scorer, the single-row function it must agree with, the
+# input features and the product shard kind the single-row function uses.
+# Anomaly requests that name a scoring mode are batched per mode.
+SCORERS = {
+    'anomaly': (anomaly_detection.detect_anomalies, anomaly_detection.detect_anomaly,
+                anomaly_detection.FEATURES, 'anomaly'),
+    **{
+        f'anomaly-{mode}': (partial(anomaly_detection.detect_anomalies, mode=mode),
+                            partial(anomaly_detection.detect_anomaly, mode=mode),
+                            anomaly_detection.FEATURES, 'anomaly')
+        for mode in anomaly_detection.MODES
+    },
+    'risk': (_risk_rows, risk_forecasting.predict_risk, risk_forecasting.FEATURES, 'risk'),
+}
+
+def batchable(row, features, shard_kind=None):
+    """
+    True when the batch scorer reads row exactly as the single-row function does:
+    an object whose features are all absent (0 in both paths) or finite numbers,
+    and whose product has no shard of shard_kind
+    """
+    if not isinstance(row, dict):
+        return False
+    try:
+        if shard_kind and product_models.shard_paths(row.get('product'), shard_kind):
+            return False
+        return all(math.isfinite(float(row.get(name, 0))) for name in features)
+    except (TypeError, ValueError, OverflowError):
+        return False
+
+class MicroBatcher:
+    """Collects rows from many coroutines into batches for one scoring function"""
+
+    def __init__(self, name, score_batch, score_row, features, shard_kind=None, max_batch=MAX_BATCH,
+                 max_wait=MAX_WAIT, executor=None, max_in_flight=1):
+        self.name = name
+        self.score_batch = score_batch
+        self.score_row = score_row
+        self.features = features
+        self.shard_kind = shard_kind
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.executor = executor
+        self.max_in_flight = max_in_flight
+        self._queue = None
+        self._task = None
+        self._slots = None
+        self.requests = 0
+        self.batches = 0
+        self.rows_scored = 0
+        self.largest_batch = 0
+        self.in_flight = 0
+        self.max_queue_depth = 0
+        self.fallbacks = 0
+        self.unbatched = 0
+        self.busy_seconds = 0.0
+
+    def start(self):
+        """Start collecting; must be called from the event loop's thread"""
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._task = asyncio.ensure_future(self._collect())
+        return self
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, row):
+        """
+        Queue one row and wait for its result
+
+        Rows that are not batchable() are scored on their own with score_row.
+        Raises what the scoring functions raise.
+        """
+        loop = asyncio.get_running_loop()
+        if not batchable(row, self.features, self.shard_kind):
+            self.unbatched += 1
+            return await loop.run_in_executor(self.executor, self.score_row, row)
+        future = loop.create_future()
+        self._queue.put_nowait((row, future))
+        self.requests += 1
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return await future
+
+    def queue_depth(self):
+        """Rows waiting to be batched"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                # Take what is already queued before waiting for more
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Bound concurrent batches to the pool; rows keep queueing meanwhile
+            await self._slots.acquire()
+            asyncio.ensure_future(self._dispatch(batch))
+
+    async def _dispatch(self, batch):
+        loop = asyncio.get_running_loop()
+        rows = [row for row, _ in batch]
+        self.in_flight += len(rows)
+        try:
+            try:
+                results, seconds, fell_back = await loop.run_in_executor(self.executor, self._score, rows)
+            except Exception as e:
+                # Every caller sees the exception, as an unbatched request would
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            # Counters are only updated on the event loop's thread
+            self.batches += 1
+            self.rows_scored += len(rows)
+            self.largest_batch = max(self.largest_batch, len(rows))
+            self.busy_seconds += seconds
+            self.fallbacks += fell_back
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self.in_flight -= len(rows)
+            self._slots.release()
+
+    def _score(self, rows):
+        # Runs on the pool; returns (results, seconds, fell back to single rows)
+        start = time.perf_counter()
+        try:
+            return self.score_batch(rows), time.perf_counter() - start, False
+        except Exception:
+            # One bad row must not fail its neighbours: score them one by one,
+            # which reports errors per row exactly as the single-row path does
+            results = [self.score_row(row) for row in rows]
+            return results, time.perf_counter() - start, True
+
+    def stats(self):
+        return {
+            'queue_depth': self.queue_depth(),
+            'max_queue_depth': self.max_queue_depth,
+            'in_flight': self.in_flight,
+            'requests': self.requests,
+            'batches': self.batches,
+            'mean_batch_size': self.rows_scored / self.batches if self.batches else 0.0,
+            'largest_batch': self.largest_batch,
+            'fallbacks': self.fallbacks,
+            'unbatched': self.unbatched,
+            'busy_seconds': self.busy_seconds,
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1000
+        }
+
+class ScoringService:
+    """One MicroBatcher per scoring kind ('anomaly', 'risk') sharing a thread pool"""
+
+    def __init__(self, max_batch=MAX_BATCH, max_wait=MAX_WAIT, executor=None, max_in_flight=1):
+        self.batchers = {
+            kind: MicroBatcher(kind, score_batch, score_row, features, shard_kind, max_batch, max_wait, executor,
+                               max_in_flight)
+            for kind, (score_batch, score_row, features, shard_kind) in SCORERS.items()
+        }
+
+    def start(self):
+        for batcher in self.batchers.values():
+            batcher.start()
+        return self
+
+    async def stop(self):
+        for batcher in self.batchers.values():
+            await batcher.stop()
+
+    async def score(self, kind, row):
+        """Score one row of the given kind, as part of a batch when it is batchable()"""
+        return await self.batchers[kind].submit(row)
+
+    def queue_depth(self):
+        return sum(batcher.queue_depth() for batcher in self.batchers.values())
+
+    def stats(self):
+        return {kind: batcher.stats() for kind, batcher in self.batchers.items()}
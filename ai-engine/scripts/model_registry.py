@@ -0,0 +1,329 @@
+"""
+Model Registry
+Loads model artifacts once per process and reloads them when they change on disk
+
+Trained models live in versioned directories (ai-engine/models/versions/<id>/)
+and the CURRENT file names the published one. Artifact paths keep their
+logical form ('ai-engine/models/risk_model.pkl') and are resolved into the
+active version: trainers write into a staging version that is only published
+once complete, and serving processes warm a newly published version in the
+background before swapping to it.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import threading
+import contextvars
+from datetime import datetime, timezone
+import timing
+from packed_forest import load_packed_forest
+
+MODELS_DIR = 'ai-engine/models'
+VERSIONS_DIR = 'ai-engine/models/versions'
+CURRENT_PATH = 'ai-engine/models/CURRENT'
+
+# Published versions kept on disk (older ones are pruned on publish)
+KEEP_VERSIONS = 3
+
+# Seconds between checks for a newly published version while watching
+WATCH_INTERVAL = 2.0
+
+class ModelNotFoundError(FileNotFoundError):
+    """A model artifact is missing; models are only trained by train_models.py"""
+
+def read_current_version():
+    """The published version id, or None before the first versioned training run"""
+    try:
+        with open(CURRENT_PATH, 'r') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def version_dir(version):
+    return os.path.join(VERSIONS_DIR, version)
+
+def _is_versioned(path):
+    return (path.startswith(MODELS_DIR + '/') and not path.startswith(VERSIONS_DIR + '/')
+            and path != CURRENT_PATH)
+
+def _link_or_copy(source, destination):
+    # Hard links make staging cheap; artifacts are always replaced, never edited in place
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+def new_version():
+    """
+    Create a staging version seeded with the current version's artifacts
+
+    Returns:
+        The new version id
+    """
+    version = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+    directory = version_dir(version)
+    current = read_current_version()
+    if current and os.path.isdir(version_dir(current)):
+        shutil.copytree(version_dir(current), directory, copy_function=_link_or_copy)
+    else:
+        os.makedirs(directory)
+    return version
+
+def publish_version(version, keep=KEEP_VERSIONS):
+    """Atomically point CURRENT at a complete version and prune old ones"""
+    tmp_path = CURRENT_PATH + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(version + "\n")
+    os.replace(tmp_path, CURRENT_PATH)
+
+    # Versions newer than this one may be staging runs; only prune older ones
+    older = sorted(name for name in os.listdir(VERSIONS_DIR) if name < version)
+    for name in older[:max(0, len(older) - (keep - 1))]:
+        shutil.rmtree(version_dir(name), ignore_errors=True)
+
+def discard_version(version):
+    """Remove an unpublished staging version"""
+    if version != read_current_version():
+        shutil.rmtree(version_dir(version), ignore_errors=True)
+
+def _load_json(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def _load_joblib(path):
+    # joblib is only imported once a pickled artifact is actually needed
+    import joblib
+    return joblib.load(path)
+
+def default_loader(path):
+    """
+    Pick a loader from the file extension
+
+    Packed forests are memory-mapped. Pickled estimators are not: sklearn copies
+    tree arrays on unpickling, and mapping hundreds of small arrays is slower
+    than reading them (see benchmarks/bench_artifacts.py).
+    """
+    if path.endswith('.json'):
+        return _load_json
+    if path.endswith('.packed'):
+        return load_packed_forest
+    return _load_joblib
+
+def save_artifact(artifact, path):
+    """Write an artifact uncompressed and swap it in atomically (into the staging version while training)"""
+    import joblib
+    path = registry.resolve(path)
+    tmp_path = path + '.tmp'
+    joblib.dump(artifact, tmp_path, compress=0)
+    os.replace(tmp_path, path)
+
+class ModelRegistry:
+    """
+    In-process cache of model artifacts keyed by their resolved path
+
+    Each lookup compares the file's mtime and size with the cached copy, so a
+    retrained model is picked up on the next call without a restart. Packed
+    forests are directories; their meta.json is used as the signature.
+
+    One-shot processes follow CURRENT on every lookup. A serving process calls
+    watch() instead: it stays on one version and swaps to a new one only after
+    loading it in the background.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._preview = contextvars.ContextVar('model_version', default=None)
+        self._watching = False
+        self._version = None
+        self._current_signature = None
+        self._current_version = None
+        self.staging = None
+        self.last_swap = None
+
+    def version(self):
+        """Version that model paths resolve into in the calling context"""
+        preview = self._preview.get()
+        if preview is not None:
+            return preview
+        if self.staging is not None:
+            return self.staging
+        if self._watching:
+            return self._version
+        try:
+            stat = os.stat(CURRENT_PATH)
+        except FileNotFoundError:
+            return None
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if signature != self._current_signature:
+            self._current_version = read_current_version()
+            self._current_signature = signature
+        return self._current_version
+
+    def resolve(self, path):
+        """
+        Physical location of a logical artifact path
+
+        'ai-engine/models/<name>' maps into the active version's directory;
+        other paths, and all paths before the first versioned run, are unchanged.
+        """
+        if not _is_versioned(path):
+            return path
+        version = self.version()
+        if version is None:
+            return path
+        return os.path.join(VERSIONS_DIR, version, path[len(MODELS_DIR) + 1:])
+
+    @staticmethod
+    def _signature(path):
+        if path.endswith('.packed'):
+            path = os.path.join(path, 'meta.json')
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def artifact_key(self, path):
+        """Resolved path and on-disk signature of an artifact; changes with every retrain or version swap"""
+        physical = self.resolve(path)
+        return (physical,) + self._signature(physical)
+
+    def exists(self, *paths):
+        """True when every given artifact is present on disk"""
+        return all(os.path.exists(self.resolve(path)) for path in paths)
+
+    def load(self, path, loader=None):
+        """
+        Return the artifact at path, loading it only if it is new or changed
+
+        Args:
+            path: Artifact path, e.g. 'ai-engine/models/risk_model.pkl'
+            loader: Optional callable(path); defaults to json/joblib by extension
+
+        Returns:
+            The loaded artifact
+
+        Raises:
+            ModelNotFoundError: The artifact has not been trained
+        """
+        physical = self.resolve(path)
+        try:
+            signature = self._signature(physical)
+        except FileNotFoundError:
+            raise ModelNotFoundError(
+                f"Model artifact not found: {physical} (train it with ai-engine/scripts/train_models.py)"
+            ) from None
+        entry = self._entries.get(physical)
+        if entry is not None and entry[0] == signature:
+            self._path_stats(path)['hits'] += 1
+            return entry[1]
+
+        with self._lock:
+            # Another thread may have loaded it while we waited
+            entry = self._entries.get(physical)
+            if entry is not None and entry[0] == signature:
+                self._path_stats(path)['hits'] += 1
+                return entry[1]
+
+            start = time.perf_counter()
+            artifact = (loader or default_loader(physical))(physical)
+            elapsed = time.perf_counter() - start
+
+            stats = self._path_stats(path)
+            stats['loads'] += 1
+            stats['load_seconds'] += elapsed
+            stats['last_load_seconds'] = elapsed
+            if timing.ENABLED:
+                timing.record('model_load', elapsed, start)
+            self._entries[physical] = (signature, artifact, path, loader)
+            return artifact
+
+    def put(self, path, artifact, loader=None):
+        """Cache an artifact this process just wrote, so it is not read back"""
+        physical = self.resolve(path)
+        with self._lock:
+            self._entries[physical] = (self._signature(physical), artifact, path, loader)
+            self._path_stats(path)
+
+    def _path_stats(self, path):
+        return self._stats.setdefault(path, {'loads': 0, 'hits': 0, 'load_seconds': 0.0})
+
+    def watch(self, warm=None, interval=WATCH_INTERVAL):
+        """
+        Stay on the current version and swap to newly published ones in the background
+
+        Args:
+            warm: Optional callable run against the new version before the swap
+                  (e.g. the server's warm-up), so caches are filled in advance
+            interval: Seconds between checks of CURRENT
+        """
+        with self._lock:
+            self._version = read_current_version()
+            self._watching = True
+
+        def poll():
+            while True:
+                time.sleep(interval)
+                version = read_current_version()
+                if version is not None and version != self._version:
+                    try:
+                        self.swap(version, warm)
+                    except Exception as e:
+                        print(f"Model version {version} not activated: {e}", file=sys.stderr)
+
+        thread = threading.Thread(target=poll, name='model-version-watch', daemon=True)
+        thread.start()
+        return thread
+
+    def swap(self, version, warm=None):
+        """
+        Load a version's artifacts, then make it the active one in a single step
+
+        Requests keep using the previous version until the swap, so they
+        never wait on loading.
+        """
+        start = time.perf_counter()
+        token = self._preview.set(version)
+        try:
+            # Everything the active version has loaded so far, then the caller's warm-up
+            for signature, artifact, path, loader in list(self._entries.values()):
+                try:
+                    self.load(path, loader)
+                except ModelNotFoundError:
+                    continue
+            if warm is not None:
+                warm()
+        finally:
+            self._preview.reset(token)
+
+        prefix = version_dir(version) + os.sep
+        with self._lock:
+            previous = self._version
+            self._version = version
+            self._entries = {physical: entry for physical, entry in self._entries.items()
+                             if physical.startswith(prefix)}
+        self.last_swap = {'from': previous, 'to': version, 'warm_seconds': time.perf_counter() - start,
+                          'at': datetime.now(timezone.utc).isoformat()}
+        print(f"✓ Model version {version} active (warmed in {self.last_swap['warm_seconds']:.2f}s)",
+              file=sys.stderr)
+        return self.last_swap
+
+    def invalidate(self, path=None):
+        """Drop one cached artifact, or all of them"""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(path, None)
+
+    def stats(self):
+        """Load counts, cache hits and load times per artifact"""
+        return {path: dict(stats) for path, stats in self._stats.items()}
+
+# Shared by every script in the process
+registry = ModelRegistry()
+
+def load_artifact(path, loader=None):
+    return registry.load(path, loader)
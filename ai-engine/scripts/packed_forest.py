@@ -0,0 +1,215 @@
+"""
+Packed Forest Artifacts
+Stores tree ensembles as flat, uncompressed NumPy arrays that load with
+mmap_mode, so cold loads are near constant time and every worker process
+shares the same pages through the OS page cache
+
+sklearn copies tree node arrays into private buffers when a pickled forest
+is loaded, so mmap cannot help pickles; the packed form is scored directly
+from the mapped arrays instead. Supported: RandomForestRegressor,
+RandomForestClassifier and IsolationForest.
+"""
+
+import os
+import json
+import shutil
+import numpy as np
+
+FORMAT_VERSION = 1
+ARRAYS = ['roots', 'left', 'right', 'feature', 'threshold', 'value']
+CHUNK_CELLS = 2_000_000
+
+def _average_path_length(n_samples):
+    """Average path length of an unsuccessful BST search (as in IsolationForest)"""
+    n_samples = np.asarray(n_samples, dtype=np.float64)
+    result = np.zeros_like(n_samples)
+    result[n_samples == 2] = 1.0
+    large = n_samples > 2
+    n = n_samples[large]
+    result[large] = 2.0 * (np.log(n - 1.0) + np.euler_gamma) - 2.0 * (n - 1.0) / n
+    return result
+
+def _node_depths(tree):
+    """Depth of every node, counting the root as 1"""
+    depths = np.zeros(tree.node_count, dtype=np.float64)
+    depths[0] = 1
+    for node in range(tree.node_count):
+        if tree.children_left[node] != -1:
+            depths[tree.children_left[node]] = depths[node] + 1
+            depths[tree.children_right[node]] = depths[node] + 1
+    return depths
+
+def pack_forest(model):
+    """
+    Flatten a fitted forest into concatenated node arrays
+
+    Returns:
+        (arrays, meta) where arrays holds roots/left/right/feature/threshold/value
+    """
+    kind = type(model).__name__
+    if kind not in ('RandomForestRegressor', 'RandomForestClassifier', 'IsolationForest'):
+        raise ValueError(f"Unsupported model type: {kind}")
+
+    features_map = getattr(model, 'estimators_features_', None)
+    roots, lefts, rights, features, thresholds, values = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for index, estimator in enumerate(model.estimators_):
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+        nodes = np.arange(tree.node_count) + offset
+        roots.append(offset)
+
+        # Leaves point to themselves with an infinite threshold, so traversal
+        # can run a fixed number of steps without tracking which rows finished
+        lefts.append(np.where(is_leaf, nodes, tree.children_left + offset))
+        rights.append(np.where(is_leaf, nodes, tree.children_right + offset))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+
+        # Map per-tree feature indices back to the full input columns
+        feature = np.maximum(tree.feature, 0).astype(np.int64)
+        if features_map is not None:
+            feature = np.asarray(features_map[index])[feature]
+        features.append(np.where(is_leaf, 0, feature))
+        max_depth = max(max_depth, int(tree.max_depth))
+
+        if kind == 'IsolationForest':
+            # Leaf value = path length to the leaf plus the expected remaining depth
+            values.append(_node_depths(tree) + _average_path_length(tree.n_node_samples) - 1.0)
+        elif kind == 'RandomForestRegressor':
+            values.append(tree.value[:, 0, 0])
+        else:
+            value = tree.value[:, 0, :]
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+        offset += tree.node_count
+
+    arrays = {
+        'roots': np.asarray(roots, dtype=np.int64),
+        'left': np.concatenate(lefts).astype(np.int64),
+        'right': np.concatenate(rights).astype(np.int64),
+        'feature': np.concatenate(features).astype(np.int64),
+        'threshold': np.concatenate(thresholds).astype(np.float64),
+        'value': np.concatenate(values).astype(np.float64),
+    }
+    meta = {
+        'format_version': FORMAT_VERSION,
+        'kind': kind,
+        'n_features': int(model.n_features_in_),
+        'n_trees': len(model.estimators_),
+        'max_depth': max_depth
+    }
+    if kind == 'IsolationForest':
+        max_samples = getattr(model, '_max_samples', getattr(model, 'max_samples_', None))
+        meta['average_path_length_max_samples'] = float(_average_path_length([max_samples])[0])
+        meta['offset'] = float(model.offset_)
+    if kind == 'RandomForestClassifier':
+        meta['classes'] = model.classes_.tolist()
+    return arrays, meta
+
+def save_packed_forest(model, path):
+    """Write a packed forest directory atomically (path is replaced as a whole)"""
+    arrays, meta = pack_forest(model)
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_path, name + '.npy'), np.ascontiguousarray(array))
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    old_path = path + '.old'
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+def load_packed_forest(path, mmap_mode='r'):
+    """Load a packed forest, memory-mapping its arrays by default"""
+    with open(os.path.join(path, 'meta.json'), 'r') as f:
+        meta = json.load(f)
+    if meta.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported packed forest version in {path}")
+    arrays = {name: np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode) for name in ARRAYS}
+    return PackedForest(arrays, meta)
+
+class PackedForest:
+    """
+    Forest scorer over flat node arrays, with the sklearn prediction API
+
+    n_trees limits scoring to the first n trees (all trees by default);
+    offset replaces an IsolationForest's decision threshold.
+    """
+
+    def __init__(self, arrays, meta, n_trees=None, offset=None):
+        self.arrays = arrays
+        self.meta = meta
+        self.kind = meta['kind']
+        self.n_features_in_ = meta['n_features']
+        self.roots = arrays['roots'][:n_trees] if n_trees else arrays['roots']
+        self.n_trees = len(self.roots)
+        if self.kind == 'IsolationForest':
+            self.offset_ = meta['offset'] if offset is None else offset
+        if self.kind == 'RandomForestClassifier':
+            self.classes_ = np.asarray(meta['classes'])
+
+    def with_trees(self, n_trees, offset=None):
+        """Scorer that uses only the first n_trees trees, optionally with its own offset"""
+        return PackedForest(self.arrays, self.meta, n_trees, offset)
+
+    def tree_values(self, X):
+        """Leaf value of every tree for every row, shape (n_trees, n_samples, ...)"""
+        return self._leaf_values(np.ascontiguousarray(X, dtype=np.float32))
+
+    def _leaf_values(self, X):
+        """Leaf value reached by every (tree, sample) pair, shape (n_trees, n_samples, ...)"""
+        left, right = self.arrays['left'], self.arrays['right']
+        feature, threshold, value = self.arrays['feature'], self.arrays['threshold'], self.arrays['value']
+        n_samples, n_features = X.shape
+
+        node = np.repeat(np.asarray(self.roots), n_samples)
+        row_offsets = np.tile(np.arange(n_samples) * n_features, self.n_trees)
+        flat_X = X.ravel()
+        for _ in range(self.meta['max_depth']):
+            # Same float32 comparison sklearn trees use
+            go_left = flat_X[row_offsets + feature[node]] <= threshold[node]
+            node = np.where(go_left, left[node], right[node])
+        return value[node].reshape((self.n_trees, n_samples) + value.shape[1:])
+
+    def _accumulate(self, X):
+        """Sum of leaf values over trees, added tree by tree like sklearn"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        # NaN compares false and would silently take the right branch; sklearn raises
+        if not np.isfinite(X).all():
+            raise ValueError("Input contains NaN or infinity")
+        total = np.zeros((X.shape[0],) + self.arrays['value'].shape[1:])
+        chunk = max(1, CHUNK_CELLS // max(self.n_trees, 1))
+        for start in range(0, X.shape[0], chunk):
+            part = total[start:start + chunk]
+            for tree_values in self._leaf_values(X[start:start + chunk]):
+                part += tree_values
+        return total
+
+    def predict(self, X):
+        if self.kind == 'RandomForestRegressor':
+            return self._accumulate(X) / self.n_trees
+        if self.kind == 'RandomForestClassifier':
+            return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+        return np.where(self.decision_function(X) < 0, -1, 1)
+
+    def predict_proba(self, X):
+        if self.kind != 'RandomForestClassifier':
+            raise AttributeError("predict_proba is only available for classifiers")
+        return self._accumulate(X) / self.n_trees
+
+    def score_samples(self, X):
+        if self.kind != 'IsolationForest':
+            raise AttributeError("score_samples is only available for IsolationForest")
+        depths = self._accumulate(X)
+        denominator = self.n_trees * self.meta['average_path_length_max_samples']
+        if denominator == 0:
+            return -np.ones_like(depths)
+        return -(2 ** (-depths / denominator))
+
+    def decision_function(self, X):
+        return self.score_samples(X) - self.offset_
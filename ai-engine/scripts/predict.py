@@ -1,40 +1,137 @@
-import pickle
 import numpy as np
 import json
 import sys
+import os
+import hashlib
+import threading
+import timing
+import features
+from model_registry import registry, load_artifact
+from linear_scorer import load_linear_scorer
+
+FORECAST_ARTIFACTS = [
+    'ai-engine/models/linear_regression.json',
+    'ai-engine/models/random_forest.packed',
+    'ai-engine/models/arima_model.pkl',
+    'ai-engine/models/metrics.json'
+]
+FORECAST_CACHE_PATH = 'ai-engine/models/forecast_cache.json'
+PRECOMPUTED_DAYS = 90
 
 def load_models():
-    lr = pickle.load(open('ai-engine/models/linear_regression.pkl', 'rb'))
-    rf = pickle.load(open('ai-engine/models/random_forest.pkl', 'rb'))
-    arima = pickle.load(open('ai-engine/models/arima_model.pkl', 'rb'))
-    metrics = json.load(open('ai-engine/models/metrics.json', 'r'))
+    lr = load_artifact('ai-engine/models/linear_regression.json', load_linear_scorer)
+    rf = load_artifact('ai-engine/models/random_forest.packed')
+    arima = load_artifact('ai-engine/models/arima_model.pkl')
+    metrics = load_artifact('ai-engine/models/metrics.json')
     return lr, rf, arima, metrics
 
-def forecast_demand(days=30):
+# Fingerprints and forecast caches of the last few model versions, so a
+# serving process warming a new version does not evict the active one's
+CACHED_VERSIONS = 2
+_fingerprints = {}
+_forecast_caches = {}
+_forecast_lock = threading.Lock()
+
+def _remember(cache, key, value):
+    cache.pop(key, None)
+    cache[key] = value
+    while len(cache) > CACHED_VERSIONS:
+        del cache[next(iter(cache))]
+
+def model_fingerprint():
+    """Content hash of the forecasting artifacts, rehashed only when a file changes"""
+    paths = [registry.resolve(path) for path in FORECAST_ARTIFACTS]
+    signature = tuple((path, os.stat(path).st_mtime_ns, os.stat(path).st_size) for path in paths)
+    if signature not in _fingerprints:
+        with timing.span('forecast.fingerprint'):
+            digest = hashlib.sha256()
+            for path in paths:
+                # Packed forests are directories of arrays
+                files = [os.path.join(path, name) for name in sorted(os.listdir(path))] if os.path.isdir(path) else [path]
+                for file_path in files:
+                    with open(file_path, 'rb') as f:
+                        digest.update(f.read())
+            _remember(_fingerprints, signature, digest.hexdigest()[:16])
+    return _fingerprints[signature]
+
+def _read_forecast_cache(fingerprint):
+    try:
+        with open(registry.resolve(FORECAST_CACHE_PATH), 'r') as f:
+            cache = json.load(f)
+        if cache.get('fingerprint') == fingerprint:
+            return cache
+    except (OSError, ValueError):
+        pass
+    return None
+
+def _write_forecast_cache(cache):
+    cache_path = registry.resolve(FORECAST_CACHE_PATH)
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, cache_path)
+
+def _forecast_days(start, stop):
+    """Ensemble forecast for future days [start, stop)"""
     lr, rf, arima, metrics = load_models()
     
-    # Generate future features
-    future_days = np.arange(365, 365 + days)
-    X_future = np.column_stack([
-        future_days % 365,
-        (future_days % 365) // 30 + 1,
-        future_days % 7
-    ])
+    # Future calendar features, computed exactly as for training
+    X_future = features.future_calendar_features(start, stop)
     
-    # Predictions
-    lr_pred = lr.predict(X_future)
-    rf_pred = rf.predict(X_future)
-    arima_pred = arima.forecast(steps=days)
+    # Predictions (ARIMA forecasts are prefix-stable, so keep only the new tail)
+    with timing.span('forecast.linear_regression'):
+        lr_pred = lr.predict(X_future)
+    with timing.span('forecast.random_forest'):
+        rf_pred = rf.predict(X_future)
+    with timing.span('forecast.arima'):
+        arima_pred = np.asarray(arima.forecast(steps=stop))[start:]
     
     # Ensemble
-    ensemble = 0.4 * lr_pred + 0.3 * rf_pred + 0.3 * arima_pred
+    return 0.4 * lr_pred + 0.3 * rf_pred + 0.3 * arima_pred
+
+def forecast_series(days):
+    """
+    Cached ensemble forecast covering at least the given number of days
     
-    # Calculate confidence
-    data_quality = 0.92
-    avg_accuracy = (metrics['linear_regression']['accuracy'] + 
-                   metrics['random_forest']['accuracy'] + 
-                   metrics['arima']['accuracy']) / 3
-    confidence = (avg_accuracy / 100) * data_quality * 100
+    The cache is keyed by the model fingerprint and persisted next to the
+    models; longer horizons only compute the missing tail.
+    """
+    fingerprint = model_fingerprint()
+    cache = _forecast_caches.get(fingerprint)
+    if cache is not None and len(cache['ensemble']) >= days:
+        return cache
+    
+    with _forecast_lock:
+        cache = _forecast_caches.get(fingerprint)
+        if cache is None:
+            cache = _read_forecast_cache(fingerprint)
+        if cache is None:
+            metrics = load_models()[3]
+            
+            # Calculate confidence
+            data_quality = 0.92
+            avg_accuracy = (metrics['linear_regression']['accuracy'] + 
+                           metrics['random_forest']['accuracy'] + 
+                           metrics['arima']['accuracy']) / 3
+            confidence = (avg_accuracy / 100) * data_quality * 100
+            cache = {'fingerprint': fingerprint, 'ensemble': [], 'confidence': confidence, 'metrics': metrics}
+        
+        cached_days = len(cache['ensemble'])
+        if cached_days < days:
+            tail = _forecast_days(cached_days, days)
+            cache = dict(cache, ensemble=cache['ensemble'] + tail.tolist())
+            _write_forecast_cache(cache)
+        _remember(_forecast_caches, fingerprint, cache)
+        return cache
+
+def precompute_forecasts(days=PRECOMPUTED_DAYS):
+    """Fill the forecast cache right after training"""
+    _forecast_caches.clear()
+    forecast_series(days)
+
+def forecast_demand(days=30):
+    cache = forecast_series(days)
+    ensemble = np.array(cache['ensemble'][:days])
     
     # Growth calculation
     current_avg = np.mean(ensemble[:7])
@@ -44,8 +141,8 @@ def forecast_demand(days=30):
     return {
         'forecast': ensemble.tolist(),
         'growth_percentage': float(growth),
-        'confidence': float(confidence),
-        'metrics': metrics
+        'confidence': float(cache['confidence']),
+        'metrics': cache['metrics']
     }
 
 def detect_anomaly(temperature, quantity, delay):
@@ -68,29 +165,129 @@ def detect_anomaly(temperature, quantity, delay):
         'explanation': explanation
     }
 
+# Fraud risk categories: below 30 Low, below 60 Medium, otherwise High
+FRAUD_THRESHOLDS = [30, 60]
+FRAUD_CATEGORIES = ('Low', 'Medium', 'High')
+FRAUD_ACTIONS = (
+    'Continue monitoring standard protocols',
+    'Increase inspection frequency and verify documentation',
+    'Immediate investigation required - halt shipment pending review'
+)
+
+# Ledger columns used by score_ledger
+FRAUD_COLUMNS = ['anomaly_score', 'delay_factor', 'trust_score']
+SCRI_COLUMNS = ['delay_score', 'temp_anomaly', 'demand_volatility']
+LEDGER_CHUNK_SIZE = 100000
+
 def calculate_fraud_risk(anomaly_score, delay_factor, trust_score):
     fraud_risk = 0.5 * anomaly_score + 0.3 * delay_factor + 0.2 * (100 - trust_score)
     
     if fraud_risk < 30:
-        category = 'Low'
-        action = 'Continue monitoring standard protocols'
+        level = 0
     elif fraud_risk < 60:
-        category = 'Medium'
-        action = 'Increase inspection frequency and verify documentation'
+        level = 1
     else:
-        category = 'High'
-        action = 'Immediate investigation required - halt shipment pending review'
+        level = 2
     
     return {
         'fraud_probability': float(fraud_risk),
-        'risk_category': category,
-        'action_recommendation': action
+        'risk_category': FRAUD_CATEGORIES[level],
+        'action_recommendation': FRAUD_ACTIONS[level]
     }
 
 def calculate_scri(fraud_risk, delay_score, temp_anomaly, demand_volatility):
     scri = 0.4 * fraud_risk + 0.3 * delay_score + 0.2 * temp_anomaly + 0.1 * demand_volatility
     return float(scri)
 
+def calculate_fraud_risk_batch(anomaly_score, delay_factor, trust_score, output="columns"):
+    """
+    Fraud risk for whole columns at once
+    
+    Args:
+        anomaly_score, delay_factor, trust_score: Equal-length sequences or arrays
+        output: "columns" for JSON-ready lists or "numpy" for arrays
+    
+    Returns:
+        Columnar results: fraud_probability, risk_category, action_recommendation
+    """
+    anomaly_score = np.asarray(anomaly_score, dtype=np.float64)
+    delay_factor = np.asarray(delay_factor, dtype=np.float64)
+    trust_score = np.asarray(trust_score, dtype=np.float64)
+    
+    # Same arithmetic and thresholds as calculate_fraud_risk, per element
+    fraud_risk = 0.5 * anomaly_score + 0.3 * delay_factor + 0.2 * (100 - trust_score)
+    level = np.searchsorted(FRAUD_THRESHOLDS, fraud_risk, side="right")
+    category = np.array(FRAUD_CATEGORIES)[level]
+    action = np.array(FRAUD_ACTIONS)[level]
+    
+    if output == "numpy":
+        return {'fraud_probability': fraud_risk, 'risk_category': category, 'action_recommendation': action}
+    if output != "columns":
+        raise ValueError(f"Unknown output format: {output}")
+    return {
+        'fraud_probability': fraud_risk.tolist(),
+        'risk_category': category.tolist(),
+        'action_recommendation': action.tolist()
+    }
+
+def calculate_scri_batch(fraud_risk, delay_score, temp_anomaly, demand_volatility):
+    """Supply Chain Risk Index for whole columns at once, as a float64 array"""
+    fraud_risk = np.asarray(fraud_risk, dtype=np.float64)
+    delay_score = np.asarray(delay_score, dtype=np.float64)
+    temp_anomaly = np.asarray(temp_anomaly, dtype=np.float64)
+    demand_volatility = np.asarray(demand_volatility, dtype=np.float64)
+    return 0.4 * fraud_risk + 0.3 * delay_score + 0.2 * temp_anomaly + 0.1 * demand_volatility
+
+def score_ledger_frame(df):
+    """
+    Add fraud and SCRI columns to a shipment ledger DataFrame
+    
+    The ledger needs delay_score, temp_anomaly and demand_volatility, plus
+    either a fraud_risk column or the fraud inputs anomaly_score,
+    delay_factor and trust_score. Missing values count as 0.
+    """
+    required = SCRI_COLUMNS + ([] if 'fraud_risk' in df.columns else FRAUD_COLUMNS)
+    missing = [column for column in required if column not in df.columns]
+    if missing:
+        raise ValueError(f"Ledger is missing columns: {', '.join(missing)}")
+    
+    df = df.copy()
+    if 'fraud_risk' in df.columns:
+        fraud_risk = df['fraud_risk'].fillna(0).to_numpy(dtype=np.float64)
+    else:
+        fraud = calculate_fraud_risk_batch(*(df[column].fillna(0).to_numpy(dtype=np.float64)
+                                             for column in FRAUD_COLUMNS), output="numpy")
+        fraud_risk = fraud['fraud_probability']
+        df['fraud_probability'] = fraud_risk
+        df['risk_category'] = fraud['risk_category']
+        df['action_recommendation'] = fraud['action_recommendation']
+    df['scri'] = calculate_scri_batch(fraud_risk, *(df[column].fillna(0).to_numpy(dtype=np.float64)
+                                                    for column in SCRI_COLUMNS))
+    return df
+
+def score_ledger(csv_path, out=None, fmt='csv', chunksize=LEDGER_CHUNK_SIZE):
+    """
+    Score a ledger CSV file (or '-' for stdin) chunk by chunk
+    
+    Writes the ledger with fraud and SCRI columns appended, as CSV or JSON lines.
+    
+    Returns:
+        Number of rows scored
+    """
+    import pandas as pd
+    out = out or sys.stdout
+    source = sys.stdin if csv_path == '-' else csv_path
+    rows = 0
+    for index, chunk in enumerate(pd.read_csv(source, chunksize=chunksize)):
+        scored = score_ledger_frame(chunk)
+        if fmt == 'jsonl':
+            scored.to_json(out, orient='records', lines=True, double_precision=15)
+        else:
+            scored.to_csv(out, index=False, header=index == 0)
+        rows += len(scored)
+    out.flush()
+    return rows
+
 if __name__ == '__main__':
     if len(sys.argv) > 1:
         action = sys.argv[1]
@@ -103,3 +300,20 @@ if __name__ == '__main__':
             delay = float(sys.argv[4])
             result = detect_anomaly(temp, qty, delay)
             print(json.dumps(result))
+        elif action == 'fraud':
+            result = calculate_fraud_risk(float(sys.argv[2]), float(sys.argv[3]), float(sys.argv[4]))
+            print(json.dumps(result))
+        elif action == 'scri':
+            result = calculate_scri(float(sys.argv[2]), float(sys.argv[3]),
+                                    float(sys.argv[4]), float(sys.argv[5]))
+            print(json.dumps(result))
+        elif action == 'ledger':
+            # Bulk mode: predict.py ledger <csv|-> [output] [--jsonl]
+            args = [arg for arg in sys.argv[2:] if arg != '--jsonl']
+            fmt = 'jsonl' if '--jsonl' in sys.argv else 'csv'
+            if len(args) > 1:
+                with open(args[1], 'w', newline='') as f:
+                    rows = score_ledger(args[0], f, fmt)
+            else:
+                rows = score_ledger(args[0] if args else '-', sys.stdout, fmt)
+            print(f"✓ {rows} ledger rows scored", file=sys.stderr)
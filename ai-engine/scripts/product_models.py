@@ -0,0 +1,293 @@
+"""
+Per-Product Models
+Trains anomaly and risk models per product into a sharded model store
+(ai-engine/models/products/<product>/) and serves them with lazy, LRU-capped loading
+"""
+
+import os
+import re
+import sys
+import json
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import anomaly_detection
+import risk_forecasting
+from model_registry import registry, save_artifact
+
+PRODUCT_MODELS_DIR = 'ai-engine/models/products'
+INDEX_PATH = 'ai-engine/models/products/index.json'
+DATA_PATH = 'ai-engine/data/sample_data.csv'
+
+MIN_ROWS = 10
+MAX_SHARDS = 64
+
+SHARD_FILES = {
+    'anomaly': ('anomaly_model.pkl', 'anomaly_scaler.pkl'),
+    'risk': ('risk_model.pkl', 'risk_scaler.pkl')
+}
+
+def shard_dir(product):
+    """
+    Directory of a product's shard: the name made filesystem-safe, plus a
+    hash of the exact name so products that sanitize alike do not collide
+    """
+    name = str(product)
+    safe = re.sub(r'[^A-Za-z0-9_]+', '_', name)
+    return os.path.join(PRODUCT_MODELS_DIR, f"{safe}-{hashlib.sha256(name.encode()).hexdigest()[:8]}")
+
+def train_product_models(data_path=DATA_PATH, min_rows=MIN_ROWS, n_jobs=None):
+    """
+    Train one anomaly model and one risk model per product
+
+    Products with fewer than min_rows rows, or whose risk labels contain a
+    single class, fall back to the global models at inference time.
+
+    Returns:
+        The shard index written to products/index.json
+    """
+    # Training-only imports, kept off the scoring path
+    from sklearn.ensemble import IsolationForest
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+    from data_loader import load_dataset
+    
+    print("Training Per-Product Models...")
+
+    dataset = load_dataset(data_path)
+    index = {}
+
+    for product in sorted(dataset.categories['product']):
+        product_rows = dataset.category_rows('product', product)
+        if len(product_rows) < min_rows:
+            print(f"  {product}: {len(product_rows)} rows, using global models")
+            continue
+
+        directory = shard_dir(product)
+        os.makedirs(registry.resolve(directory), exist_ok=True)
+        entry = {'dir': directory, 'rows': int(len(product_rows)), 'anomaly': True, 'risk': False}
+
+        # Each shard trains on a bounded sample of its product's rows
+        rows = dataset.sample_rows(rows=product_rows)
+
+        # Anomaly shard
+        X = dataset.matrix(anomaly_detection.FEATURES, rows)
+        scaler = StandardScaler()
+        model = IsolationForest(n_jobs=n_jobs, **anomaly_detection.MODEL_PARAMS)
+        model.fit(scaler.fit_transform(X))
+        model.set_params(n_jobs=None)
+        model_file, scaler_file = SHARD_FILES['anomaly']
+        save_artifact(model, os.path.join(directory, model_file))
+        save_artifact(scaler, os.path.join(directory, scaler_file))
+
+        # Risk shard (needs both classes to fit)
+        X, y = risk_forecasting.training_arrays(dataset, rows, cache_name='risk_' + os.path.basename(directory))
+        if len(np.unique(y)) > 1:
+            scaler = StandardScaler()
+            model = LogisticRegression(**risk_forecasting.MODEL_PARAMS)
+            model.fit(scaler.fit_transform(X), y)
+            model_file, scaler_file = SHARD_FILES['risk']
+            save_artifact(model, os.path.join(directory, model_file))
+            save_artifact(scaler, os.path.join(directory, scaler_file))
+            entry['risk'] = True
+
+        index[str(product)] = entry
+        print(f"  {product}: {len(product_rows)} rows, risk model {'trained' if entry['risk'] else 'skipped (one class)'}")
+
+    # Written last and atomically; shard files are replaced, never edited in place
+    os.makedirs(registry.resolve(PRODUCT_MODELS_DIR), exist_ok=True)
+    index_path = registry.resolve(INDEX_PATH)
+    with open(index_path + '.tmp', 'w') as f:
+        json.dump(index, f, indent=2)
+    os.replace(index_path + '.tmp', index_path)
+
+    # Drop shards the new index no longer references (carried over from the
+    # previous version, or from products that fell below min_rows)
+    products_dir = registry.resolve(PRODUCT_MODELS_DIR)
+    current = {os.path.basename(entry['dir']) for entry in index.values()}
+    for name in os.listdir(products_dir):
+        path = os.path.join(products_dir, name)
+        if os.path.isdir(path) and name not in current:
+            shutil.rmtree(path, ignore_errors=True)
+
+    print(f"✓ {len(index)} product shards trained and saved")
+    return index
+
+class ShardStore:
+    """
+    Lazily loaded product shards, capped at max_shards with LRU eviction
+
+    A shard is only read from disk the first time its product is requested.
+    Files load through the model registry (so they follow the active model
+    version); evicting a shard also drops them from the registry's cache.
+    """
+
+    def __init__(self, max_shards=MAX_SHARDS):
+        self.max_shards = max_shards
+        self._shards = OrderedDict()
+        self._index = None
+        self._index_signature = None
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def index(self):
+        """Shard index, re-read when products/index.json or the model version changes"""
+        index_path = registry.resolve(INDEX_PATH)
+        if not os.path.exists(index_path):
+            return {}
+        stat = os.stat(index_path)
+        signature = (index_path, stat.st_mtime_ns, stat.st_size)
+        if signature != self._index_signature:
+            with open(index_path, 'r') as f:
+                self._index = json.load(f)
+            self._index_signature = signature
+            with self._lock:
+                self._shards.clear()
+        return self._index
+
+    def _load(self, entry):
+        kinds = ['anomaly', 'risk'] if entry.get('risk') else ['anomaly']
+        paths = [os.path.join(entry['dir'], name) for kind in kinds for name in SHARD_FILES[kind]]
+        shard = {
+            kind: tuple(registry.load(os.path.join(entry['dir'], name)) for name in SHARD_FILES[kind])
+            for kind in kinds
+        }
+        # Physical files this shard was loaded from, released on eviction
+        shard['files'] = [registry.resolve(path) for path in paths]
+        return shard
+
+    def get(self, product):
+        """Return the product's shard, or None if it has no dedicated models"""
+        entry = self.index().get(str(product))
+        if entry is None:
+            return None
+
+        with self._lock:
+            shard = self._shards.get(product)
+            if shard is not None:
+                self._shards.move_to_end(product)
+                self.hits += 1
+                return shard
+
+            shard = self._load(entry)
+            self.loads += 1
+            self._shards[product] = shard
+            while len(self._shards) > self.max_shards:
+                _, evicted = self._shards.popitem(last=False)
+                for path in evicted['files']:
+                    registry.invalidate(path)
+                self.evictions += 1
+            return shard
+
+    def stats(self):
+        return {
+            'resident': list(self._shards.keys()),
+            'max_shards': self.max_shards,
+            'loads': self.loads,
+            'hits': self.hits,
+            'evictions': self.evictions
+        }
+
+# Shared by every caller in the process
+store = ShardStore(int(os.environ.get('AI_MAX_PRODUCT_SHARDS', MAX_SHARDS)))
+
+def shard_paths(product, kind):
+    """Artifact paths of a product's (model, scaler) for kind ('anomaly' or 'risk'), or None without a shard"""
+    if product is None:
+        return None
+    entry = store.index().get(str(product))
+    if entry is None or not entry.get(kind):
+        return None
+    return [os.path.join(entry['dir'], name) for name in SHARD_FILES[kind]]
+
+def shard_models(product, kind):
+    """A product's (model, scaler) for kind, or None when it falls back to the global models"""
+    if shard_paths(product, kind) is None:
+        return None
+    return store.get(product)[kind]
+
+def _as_frame(records):
+    import pandas as pd
+    if isinstance(records, str):
+        return pd.read_csv(records)
+    if isinstance(records, pd.DataFrame):
+        return records.reset_index(drop=True)
+    return pd.DataFrame.from_records(list(records))
+
+def _product_groups(df):
+    """Row positions per product, so each shard is scored in one pass"""
+    if 'product' not in df.columns:
+        return {None: np.arange(len(df))}
+    return df.groupby('product', sort=False, dropna=False).indices
+
+def detect_anomalies_by_product(records):
+    """
+    Batch anomaly detection using each row's product shard
+
+    Args:
+        records: List of dicts, a DataFrame or a CSV path with a product column
+
+    Returns:
+        List of dictionaries with anomaly, score, severity and the model used
+    """
+    df = _as_frame(records)
+    if len(df) == 0:
+        return []
+    anomalies = np.zeros(len(df), dtype=bool)
+    scores = np.zeros(len(df))
+    sources = np.empty(len(df), dtype=object)
+
+    for product, rows in _product_groups(df).items():
+        shard = store.get(product) if product is not None else None
+        model, scaler = shard['anomaly'] if shard else anomaly_detection.load_model()
+        X_scaled = scaler.transform(anomaly_detection.feature_matrix(df.iloc[rows]))
+        anomalies[rows], scores[rows] = anomaly_detection.score_rows(model, X_scaled)
+        sources[rows] = str(product) if shard else 'global'
+
+    severity = np.select([scores < -0.5, scores < -0.2], ["HIGH", "MEDIUM"], default="LOW")
+    return [
+        {"anomaly": anomaly, "score": score, "severity": level, "model": source}
+        for anomaly, score, level, source in zip(anomalies.tolist(), scores.tolist(), severity.tolist(), sources)
+    ]
+
+def predict_risk_by_product(records):
+    """
+    Batch risk prediction using each row's product shard
+
+    Returns:
+        Columnar results: risk_probability, risk_level, confidence, model
+    """
+    df = _as_frame(records)
+    if len(df) == 0:
+        return {"risk_probability": [], "risk_level": [], "confidence": [], "model": []}
+    probability = np.zeros(len(df))
+    sources = np.empty(len(df), dtype=object)
+
+    for product, rows in _product_groups(df).items():
+        shard = store.get(product) if product is not None else None
+        model, scaler = shard['risk'] if shard and 'risk' in shard else risk_forecasting.load_model()
+        X = risk_forecasting.risk_matrix(df.iloc[rows])
+        probability[rows] = model.predict_proba((X - scaler.mean_) / scaler.scale_)[:, 1]
+        sources[rows] = str(product) if shard and 'risk' in shard else 'global'
+
+    level_index = np.searchsorted([0.4, 0.7], probability, side="right")
+    return {
+        "risk_probability": probability.tolist(),
+        "risk_level": risk_forecasting.RISK_LEVELS[level_index].tolist(),
+        "confidence": np.maximum(probability, 1 - probability).tolist(),
+        "model": sources.tolist()
+    }
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == '--batch':
+        # Batch mode - score a CSV file with per-product models as JSON lines
+        for result in detect_anomalies_by_product(sys.argv[2]):
+            print(json.dumps(result))
+    else:
+        train_product_models()
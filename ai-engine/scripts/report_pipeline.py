@@ -0,0 +1,97 @@
+"""
+Fused Report Pipeline
+Runs forecast, anomaly detection and risk prediction in one process and
+turns the results into the AI insight report
+"""
+
+import sys
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import timing
+
+with timing.span('import'):
+    import predict
+    import anomaly_detection
+    import risk_forecasting
+    from insight_generator import generate_insight_report
+
+# Fallbacks used when a stage fails, matching the previous Node pipeline
+FORECAST_FALLBACK = {"growth_percentage": 0, "confidence": 0}
+
+_pool = ThreadPoolExecutor(max_workers=3)
+
+def _forecast():
+    try:
+        return predict.forecast_demand()
+    except Exception:
+        return dict(FORECAST_FALLBACK)
+
+def generate_full_report(params):
+    """
+    Generate the complete AI report for one scenario
+
+    Args:
+        params: Dictionary with optional keys: demand, quantity, delay_days,
+                temperature, stock_level (missing or zero values use defaults)
+
+    Returns:
+        Dictionary with report_text, combined_score, demand_forecast,
+        anomaly_status and risk_assessment
+    """
+    anomaly_input = {
+        "demand": params.get('demand') or 500,
+        "quantity": params.get('quantity') or 1000,
+        "delay_days": params.get('delay_days') or 0,
+        "temperature": params.get('temperature') or 25,
+        "stock_level": params.get('stock_level') or 800
+    }
+    risk_input = {
+        "demand": anomaly_input['demand'],
+        "delay_days": anomaly_input['delay_days'],
+        "temperature": anomaly_input['temperature'],
+        "stock_level": anomaly_input['stock_level']
+    }
+
+    # Run the three predictions concurrently
+    forecast_future = timing.submit(_pool, 'report.forecast', _forecast)
+    anomaly_future = timing.submit(_pool, 'report.anomaly', anomaly_detection.detect_anomaly, anomaly_input)
+    risk_future = timing.submit(_pool, 'report.risk', risk_forecasting.predict_risk, risk_input)
+    forecast_result = forecast_future.result()
+    anomaly_result = anomaly_future.result()
+    risk_result = risk_future.result()
+
+    with timing.span('report.text'):
+        report_text = generate_insight_report({
+            "demand_forecast": forecast_result,
+            "anomaly_status": anomaly_result,
+            "risk_level": risk_result.get('risk_level'),
+            "risk_probability": risk_result.get('risk_probability'),
+            "top_factors": risk_result.get('top_factors') or []
+        })
+
+    # Calculate combined score
+    combined_score = (
+        (forecast_result.get('confidence') or 0) * 0.3 +
+        (0 if anomaly_result.get('anomaly') else 100) * 0.3 +
+        ((1 - risk_result['risk_probability']) * 100) * 0.4
+    )
+
+    return {
+        "report_text": report_text,
+        "combined_score": f"{combined_score:.1f}",
+        "demand_forecast": forecast_result,
+        "anomaly_status": anomaly_result,
+        "risk_assessment": risk_result
+    }
+
+if __name__ == "__main__":
+    try:
+        input_data = json.loads(sys.argv[1]) if len(sys.argv) > 1 else {}
+        with timing.collect() as request_timing:
+            result = generate_full_report(input_data)
+        if request_timing is not None:
+            result['timing'] = request_timing.block()
+        print(json.dumps(result))
+    except Exception as e:
+        print(json.dumps({"error": str(e)}))
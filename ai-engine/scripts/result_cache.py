@@ -0,0 +1,142 @@
+"""
+Result Cache
+Optional LRU + TTL cache of single-row scoring results, keyed by the model
+artifact in use and the input features quantized to a fixed precision
+
+Disabled unless AI_RESULT_CACHE is set. Inputs that agree after quantization
+share one result, so near-identical dashboard requests are scored once per
+TTL; a retrained model or a version swap changes the key. Error results are
+never cached.
+
+    AI_RESULT_CACHE=1                   enable
+    AI_RESULT_CACHE_SIZE=4096           entries per cache (LRU beyond that)
+    AI_RESULT_CACHE_TTL=300             seconds an entry stays valid
+    AI_RESULT_CACHE_PRECISION=0.01      input quantization step
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+
+ENABLED = os.environ.get('AI_RESULT_CACHE', '').lower() not in ('', '0', 'false', 'no')
+MAX_SIZE = int(os.environ.get('AI_RESULT_CACHE_SIZE', 4096))
+TTL = float(os.environ.get('AI_RESULT_CACHE_TTL', 300))
+PRECISION = float(os.environ.get('AI_RESULT_CACHE_PRECISION', 0.01))
+
+class ResultCache:
+    """Thread-safe LRU cache with per-entry expiry and hit/miss/eviction counters"""
+
+    def __init__(self, name, max_size=MAX_SIZE, ttl=TTL, precision=PRECISION, enabled=ENABLED):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.precision = precision
+        self.enabled = enabled
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.bypassed = 0
+
+    def quantize(self, values):
+        """Input values as a tuple of integer multiples of the precision"""
+        return tuple(round(float(value) / self.precision) for value in values)
+
+    def get(self, key):
+        """Cached result for key, or None when missing or expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def cached(self, model_key, values, compute):
+        """
+        Return compute()'s result, served from the cache when possible
+
+        Args:
+            model_key: Callable returning the key of the model in use
+            values: Callable returning the input feature values, in model order
+            compute: Callable scoring the input; returns a result dict
+
+        Keys are built inside the cache, so input compute() would reject
+        (not a dict, non-numeric values) reaches compute() and gets its error.
+
+        Returns:
+            The result dict (a copy when served from the cache)
+        """
+        if not self.enabled:
+            return compute()
+        try:
+            key = (model_key(), self.quantize(values()))
+        except (AttributeError, TypeError, ValueError, OverflowError, OSError):
+            # Unusable input or no trained model: let compute() report it
+            with self._lock:
+                self.bypassed += 1
+            return compute()
+
+        result = self.get(key)
+        if result is not None:
+            return dict(result)
+        result = compute()
+        if 'error' not in result:
+            self.put(key, dict(result))
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Counters and configuration, for the server's stats action"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'precision': self.precision,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'bypassed': self.bypassed
+            }
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_cache(name):
+    """The process-wide cache with the given name, created on first use"""
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = ResultCache(name)
+        return _caches[name]
+
+def stats():
+    """Stats of every cache in the process"""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {cache.name: cache.stats() for cache in caches}
@@ -5,45 +5,50 @@ Predicts supply chain risk levels
 
 import sys
 import json
-import pandas as pd
 import numpy as np
-import joblib
 import os
-from sklearn.linear_model import LogisticRegression
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
+import timing
+import features
+import result_cache
+from model_registry import registry, save_artifact
+from linear_scorer import export_linear_model, load_linear_scorer, from_sklearn
 
 # Paths
 MODEL_PATH = 'ai-engine/models/risk_model.pkl'
 SCALER_PATH = 'ai-engine/models/risk_scaler.pkl'
+IMPORTANCE_PATH = 'ai-engine/models/risk_feature_importance.pkl'
+SCORER_PATH = 'ai-engine/models/risk_scorer.json'
 DATA_PATH = 'ai-engine/data/sample_data.csv'
 
+FEATURES = ['demand', 'delay_days', 'temperature', 'stock_level']
+RISK_LEVELS = np.array(["LOW", "MEDIUM", "HIGH"])
+
+# Logistic Regression hyperparameters (also fingerprinted by train_models.py)
+MODEL_PARAMS = {'random_state': 42, 'max_iter': 1000}
+
 def create_risk_labels(df):
-    """Create risk labels based on business logic"""
-    # Risk factors: high delay, extreme temperature, low stock
-    risk_score = (
-        (df['delay_days'] > 3).astype(int) * 0.4 +
-        ((df['temperature'] < 15) | (df['temperature'] > 30)).astype(int) * 0.3 +
-        (df['stock_level'] < df['demand'] * 0.5).astype(int) * 0.3
-    )
-    
-    # 0 = low risk, 1 = high risk
-    return (risk_score > 0.5).astype(int)
+    """Create risk labels based on business logic (see features.risk_labels)"""
+    return features.risk_labels(df)
+
+def training_arrays(dataset, rows, cache_name='risk'):
+    """Feature matrix and risk labels for the given rows of a data_loader dataset (cached)"""
+    return features.risk_training_arrays(dataset, rows, FEATURES, name=cache_name)
 
 def train_risk_model():
     """Train Logistic Regression model for risk prediction"""
-    print("Training Risk Forecasting Model...")
+    # Training-only imports, kept off the scoring path
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.model_selection import train_test_split
+    from data_loader import load_dataset
     
-    # Load data
-    df = pd.read_csv(DATA_PATH)
+    print("Training Risk Forecasting Model...")
     
-    # Create risk labels
-    df['risk_label'] = create_risk_labels(df)
+    # Load data (memory-mapped columnar cache of the CSV)
+    dataset = load_dataset(DATA_PATH)
     
-    # Select features
-    features = ['demand', 'delay_days', 'temperature', 'stock_level']
-    X = df[features].fillna(0)
-    y = df['risk_label']
+    # Features and risk labels of a bounded sample (the solver has no partial_fit)
+    X, y = training_arrays(dataset, dataset.sample_rows())
     
     # Split data
     X_train, X_test, y_train, y_test = train_test_split(
@@ -56,7 +61,7 @@ def train_risk_model():
     X_test_scaled = scaler.transform(X_test)
     
     # Train Logistic Regression
-    model = LogisticRegression(random_state=42, max_iter=1000)
+    model = LogisticRegression(**MODEL_PARAMS)
     model.fit(X_train_scaled, y_train)
     
     # Calculate accuracy
@@ -64,7 +69,7 @@ def train_risk_model():
     print(f"Model Accuracy: {accuracy:.2%}")
     
     # Get feature importance (coefficients)
-    feature_importance = dict(zip(features, abs(model.coef_[0])))
+    feature_importance = dict(zip(FEATURES, abs(model.coef_[0])))
     sorted_features = sorted(feature_importance.items(), key=lambda x: x[1], reverse=True)
     
     print("\nFeature Importance:")
@@ -73,57 +78,108 @@ def train_risk_model():
     
     # Save model and scaler
     os.makedirs('ai-engine/models', exist_ok=True)
-    joblib.dump(model, MODEL_PATH)
-    joblib.dump(scaler, SCALER_PATH)
-    joblib.dump(dict(sorted_features), 'ai-engine/models/risk_feature_importance.pkl')
+    save_artifact(model, MODEL_PATH)
+    save_artifact(scaler, SCALER_PATH)
+    save_artifact(dict(sorted_features), IMPORTANCE_PATH)
+    
+    # Scaler and coefficients folded into one NumPy-only scorer
+    export_linear_model(
+        model, registry.resolve(SCORER_PATH), scaler, X_check=X_test, features=FEATURES,
+        meta={'feature_importance': {feat: float(importance) for feat, importance in sorted_features}}
+    )
     
     print("\n✓ Risk Forecasting Model trained and saved")
     return model, scaler
 
 def load_model():
-    """Load trained model or train new one"""
-    if os.path.exists(MODEL_PATH) and os.path.exists(SCALER_PATH):
-        model = joblib.load(MODEL_PATH)
-        scaler = joblib.load(SCALER_PATH)
-        return model, scaler
-    else:
-        return train_risk_model()
+    """Load the trained model and scaler (raises ModelNotFoundError if untrained)"""
+    return registry.load(MODEL_PATH), registry.load(SCALER_PATH)
+
+def load_scorer():
+    """Folded NumPy scorer, built from the pickled model if it was not exported"""
+    if registry.exists(SCORER_PATH):
+        return registry.load(SCORER_PATH, load_linear_scorer)
+    model, scaler = load_model()
+    return from_sklearn(model, scaler, FEATURES)
+
+def load_top_factors():
+    """Load the three most important risk factors"""
+    if registry.exists(SCORER_PATH):
+        importance = registry.load(SCORER_PATH, load_linear_scorer).meta.get('feature_importance')
+        if importance:
+            return list(importance.keys())[:3]
+    if registry.exists(IMPORTANCE_PATH):
+        return list(registry.load(IMPORTANCE_PATH).keys())[:3]
+    return ['delay_days', 'temperature', 'demand']
+
+_result_cache = result_cache.get_cache('risk')
+
+def _shard_paths(data_dict):
+    """Artifact paths of the row's product risk shard, or None to use the global model"""
+    if data_dict.get('product') is None:
+        return None
+    # product_models imports this module, so it is imported on first use
+    import product_models
+    return product_models.shard_paths(data_dict['product'], 'risk')
+
+def load_product_scorer(data_dict):
+    """
+    Folded scorer and top factors of the row's product risk shard, or None
+    to use the global model
+    """
+    if data_dict.get('product') is None:
+        return None
+    import product_models
+    shard = product_models.shard_models(data_dict['product'], 'risk')
+    if shard is None:
+        return None
+    model, scaler = shard
+    importance = np.abs(model.coef_[0])
+    top_factors = [FEATURES[i] for i in np.argsort(-importance, kind='stable')[:3]]
+    return from_sklearn(model, scaler, FEATURES), top_factors
+
+def _scorer_key(data_dict):
+    # The artifacts _predict_risk() scores the row with
+    paths = _shard_paths(data_dict)
+    if paths:
+        return tuple(registry.artifact_key(path) for path in paths)
+    try:
+        return registry.artifact_key(SCORER_PATH)
+    except FileNotFoundError:
+        return registry.artifact_key(MODEL_PATH), registry.artifact_key(SCALER_PATH)
 
 def predict_risk(data_dict):
     """
     Predict risk level for given data
     
     Args:
-        data_dict: Dictionary with keys: demand, delay_days, temperature, stock_level
+        data_dict: Dictionary with keys: demand, delay_days, temperature, stock_level,
+                   and optionally product (scored with that product's shard when it has one)
     
     Returns:
-        Dictionary with risk probability and level
+        Dictionary with risk probability and level (from the result cache when enabled)
     """
+    return _result_cache.cached(
+        lambda: _scorer_key(data_dict),
+        lambda: [data_dict.get(name, 0) for name in FEATURES],
+        lambda: _predict_risk(data_dict)
+    )
+
+def _predict_risk(data_dict):
     try:
-        # Load model
-        model, scaler = load_model()
-        
-        # Load feature importance
-        if os.path.exists('ai-engine/models/risk_feature_importance.pkl'):
-            feature_importance = joblib.load('ai-engine/models/risk_feature_importance.pkl')
-            top_factors = list(feature_importance.keys())[:3]
+        # Load model and feature importance: the product's shard if it has one
+        product_scorer = load_product_scorer(data_dict)
+        if product_scorer:
+            scorer, top_factors = product_scorer
         else:
-            top_factors = ['delay_days', 'temperature', 'demand']
+            scorer, top_factors = load_scorer(), load_top_factors()
         
         # Prepare input
-        features = ['demand', 'delay_days', 'temperature', 'stock_level']
-        input_data = [[
-            data_dict.get('demand', 0),
-            data_dict.get('delay_days', 0),
-            data_dict.get('temperature', 0),
-            data_dict.get('stock_level', 0)
-        ]]
+        input_data = [float(data_dict.get(name, 0)) for name in FEATURES]
         
-        # Scale input
-        input_scaled = scaler.transform(input_data)
-        
-        # Predict probability
-        risk_probability = model.predict_proba(input_scaled)[0][1]  # Probability of high risk
+        # Predict probability (scaling is folded into the weights)
+        with timing.span('risk.predict'):
+            risk_probability = scorer.probability_row(input_data)  # Probability of high risk
         
         # Determine risk level
         if risk_probability < 0.4:
@@ -147,6 +203,68 @@ def predict_risk(data_dict):
             "risk_level": "UNKNOWN"
         }
 
+def risk_matrix(rows):
+    """Build a float64 feature matrix from dicts, a DataFrame or an (N, 4) array"""
+    if isinstance(rows, np.ndarray):
+        return np.asarray(rows, dtype=np.float64).reshape(-1, len(FEATURES))
+    if hasattr(rows, 'reindex'):
+        return rows.reindex(columns=FEATURES).fillna(0).to_numpy(dtype=np.float64)
+    
+    # Lists of dicts skip pandas; missing keys and None become 0
+    X = np.array([[row.get(name) for name in FEATURES] for row in rows], dtype=np.float64)
+    X = X.reshape(-1, len(FEATURES))
+    X[np.isnan(X)] = 0
+    return X
+
+def predict_risk_batch(rows, output="columns"):
+    """
+    Predict risk levels for many rows with one folded matrix-vector product
+    
+    Args:
+        rows: List of dicts, a DataFrame, or an (N, 4) array with columns in
+              FEATURES order (demand, delay_days, temperature, stock_level)
+        output: "columns" for JSON-ready lists, "numpy" for arrays,
+                or "arrow" for a pyarrow.Table
+    
+    Returns:
+        Columnar results: risk_probability, risk_level, confidence, plus the
+        shared top_factors (not included in the Arrow table)
+    """
+    scorer = load_scorer()
+    with timing.span('risk.features'):
+        X = risk_matrix(rows)
+    
+    # One matrix-vector product; scaling is folded into the weights
+    with timing.span('risk.predict'):
+        risk_probability = scorer.probability(X)
+    
+    # Bucket into LOW (<0.4), MEDIUM (<0.7) and HIGH
+    level_index = np.searchsorted([0.4, 0.7], risk_probability, side="right")
+    confidence = np.maximum(risk_probability, 1 - risk_probability)
+    
+    if output == "numpy":
+        return {
+            "risk_probability": risk_probability,
+            "risk_level": RISK_LEVELS[level_index],
+            "confidence": confidence,
+            "top_factors": load_top_factors()
+        }
+    if output == "arrow":
+        import pyarrow as pa
+        return pa.table({
+            "risk_probability": risk_probability,
+            "risk_level": pa.DictionaryArray.from_arrays(level_index.astype(np.int8), RISK_LEVELS.tolist()),
+            "confidence": confidence
+        })
+    if output != "columns":
+        raise ValueError(f"Unknown output format: {output}")
+    return {
+        "risk_probability": risk_probability.tolist(),
+        "risk_level": RISK_LEVELS[level_index].tolist(),
+        "confidence": confidence.tolist(),
+        "top_factors": load_top_factors()
+    }
+
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         # CLI mode - receive JSON input
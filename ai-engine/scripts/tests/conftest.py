@@ -0,0 +1,44 @@
+"""
+Shared fixtures for the scripts' tests
+
+The scripts import each other as siblings and use paths relative to the
+repository root, so tests put the scripts directory on sys.path and run
+inside a temporary copy of the ai-engine/ layout.
+"""
+
+import os
+import sys
+import shutil
+
+import pytest
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_ROOT = os.path.dirname(os.path.dirname(SCRIPTS_DIR))
+sys.path.insert(0, SCRIPTS_DIR)
+
+SAMPLE_DATA = os.path.join(REPO_ROOT, 'ai-engine', 'data', 'sample_data.csv')
+
+@pytest.fixture(scope='session')
+def trained_root(tmp_path_factory):
+    """A working directory with the sample data and freshly trained anomaly and risk models"""
+    root = tmp_path_factory.mktemp('repo')
+    os.makedirs(root / 'ai-engine' / 'data')
+    os.makedirs(root / 'ai-engine' / 'models')
+    shutil.copy(SAMPLE_DATA, root / 'ai-engine' / 'data' / 'sample_data.csv')
+
+    previous = os.getcwd()
+    os.chdir(root)
+    try:
+        import anomaly_detection
+        import risk_forecasting
+        anomaly_detection.train_anomaly_model()
+        risk_forecasting.train_risk_model()
+    finally:
+        os.chdir(previous)
+    return root
+
+@pytest.fixture
+def trained(trained_root, monkeypatch):
+    """Run the test inside trained_root"""
+    monkeypatch.chdir(trained_root)
+    return trained_root
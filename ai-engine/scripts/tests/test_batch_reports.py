@@ -0,0 +1,15 @@
+import io
+import json
+
+from batch_reports import generate_batch_reports, iter_rows
+
+def test_malformed_json_lines_become_row_errors(tmp_path):
+    source = tmp_path / 'results.jsonl'
+    source.write_text('{"id": "a", "risk_level": "LOW"}\n{"id": broken\n\n[1, 2]\n{"id": "b", "anomaly": true}\n')
+    out = io.StringIO()
+    stats = generate_batch_reports(iter_rows(str(source)), out, fmt='json', workers=1)
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert (stats['reports'], stats['errors']) == (2, 2)
+    assert [record['id'] for record in records] == ['a', 1, 2, 'b']
+    assert [record.get('line') for record in records] == [None, 2, 4, None]
+    assert 'report' in records[0] and 'report' in records[3]
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import IsolationForest
+
+from anomaly_detection import MODEL_PARAMS, score_rows, select_fast_mode, split_validation
+from packed_forest import save_packed_forest, load_packed_forest
+
+@pytest.fixture(scope='module')
+def forest(tmp_path_factory):
+    rng = np.random.RandomState(3)
+    X = rng.normal(size=(3000, 5))
+    X[:100] *= 4
+    train, validation = split_validation(len(X))
+    model = IsolationForest(**MODEL_PARAMS).fit(X[train])
+    path = str(tmp_path_factory.mktemp('fast') / 'model.packed')
+    save_packed_forest(model, path)
+    return load_packed_forest(path), X[train], X[validation]
+
+def test_split_validation_is_fixed_and_disjoint():
+    train, validation = split_validation(1000)
+    assert len(validation) == 200
+    assert not set(train) & set(validation)
+    np.testing.assert_array_equal(np.sort(np.concatenate([train, validation])), np.arange(1000))
+    again = split_validation(1000)
+    np.testing.assert_array_equal(again[1], validation)
+
+def test_prefix_offsets_are_contamination_percentiles(forest):
+    packed, X_train, X_validation = forest
+    fast_mode = select_fast_mode(packed, X_train, X_validation, target=0.95, min_validation=0)
+    n_trees = fast_mode['n_trees']
+    assert n_trees < packed.n_trees
+    prefix = packed.with_trees(n_trees)
+    expected = np.percentile(prefix.score_samples(X_train), 100.0 * MODEL_PARAMS['contamination'])
+    assert fast_mode['offset'] == pytest.approx(expected, rel=1e-12)
+
+def test_reported_agreement_matches_fast_scorer(forest):
+    packed, X_train, X_validation = forest
+    fast_mode = select_fast_mode(packed, X_train, X_validation, target=0.95, min_validation=0)
+    fast = packed.with_trees(fast_mode['n_trees'], fast_mode['offset'])
+    agreement = (score_rows(fast, X_validation)[0] == score_rows(packed, X_validation)[0]).mean()
+    assert fast_mode['agreement'] == pytest.approx(agreement)
+    assert fast_mode['agreement'] >= 0.95
+
+def test_too_few_validation_rows_keep_every_tree(forest):
+    packed, X_train, X_validation = forest
+    fast_mode = select_fast_mode(packed, X_train, X_validation[:50], target=0.5, min_validation=100)
+    assert fast_mode['n_trees'] == packed.n_trees
+    assert fast_mode['offset'] == packed.offset_
+    assert fast_mode['speedup'] == 1.0
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression, LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from linear_scorer import TOLERANCE, export_linear_model, load_linear_scorer
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.RandomState(1)
+    X = rng.normal(loc=[500, 1000, 3, 25, 800], scale=[200, 300, 2, 8, 250], size=(300, 5))
+    y = (X[:, 2] > 3).astype(int)
+    return X, y
+
+def exported(model, scaler, X, tmp_path):
+    path = str(tmp_path / 'scorer.json')
+    export_linear_model(model, path, scaler, X_check=X)
+    return load_linear_scorer(path)
+
+def test_logistic_scorer_matches_pipeline(data, tmp_path):
+    X, y = data
+    scaler = StandardScaler().fit(X)
+    model = LogisticRegression().fit(scaler.transform(X), y)
+    scorer = exported(model, scaler, X, tmp_path)
+    np.testing.assert_allclose(scorer.predict_proba(X), model.predict_proba(scaler.transform(X)),
+                               rtol=TOLERANCE, atol=TOLERANCE)
+    np.testing.assert_array_equal(scorer.predict(X), model.predict(scaler.transform(X)))
+
+def test_regression_scorer_matches_pipeline(data, tmp_path):
+    X, _ = data
+    target = X @ [0.5, -0.2, 3.0, 1.5, 0.01] + 7
+    scaler = StandardScaler().fit(X)
+    model = LinearRegression().fit(scaler.transform(X), target)
+    scorer = exported(model, scaler, X, tmp_path)
+    np.testing.assert_allclose(scorer.predict(X), model.predict(scaler.transform(X)),
+                               rtol=TOLERANCE, atol=TOLERANCE)
+
+def test_row_and_batch_scores_are_identical(data, tmp_path):
+    X, y = data
+    scaler = StandardScaler().fit(X)
+    scorer = exported(LogisticRegression().fit(scaler.transform(X), y), scaler, X, tmp_path)
+    rows = X.tolist()
+    assert [scorer.decision_row(row) for row in rows] == scorer.decision_function(X).tolist()
+    assert [scorer.probability_row(row) for row in rows] == scorer.probability(X).tolist()
+
+@pytest.mark.parametrize('bad', [float('nan'), float('inf')])
+def test_non_finite_features_raise(data, tmp_path, bad):
+    X, y = data
+    scaler = StandardScaler().fit(X)
+    scorer = exported(LogisticRegression().fit(scaler.transform(X), y), scaler, X, tmp_path)
+    row = X[0].tolist()
+    row[3] = bad
+    with pytest.raises(ValueError):
+        scorer.decision_row(row)
+    with pytest.raises(ValueError):
+        scorer.probability(np.array([row]))
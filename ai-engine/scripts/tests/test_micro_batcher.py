@@ -0,0 +1,63 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import anomaly_detection
+import risk_forecasting
+from micro_batcher import ScoringService, batchable
+
+ROWS = [
+    {'demand': 500, 'quantity': 1000, 'delay_days': 2, 'temperature': 25, 'stock_level': 800},
+    {'demand': 5000, 'quantity': 10, 'delay_days': 30, 'temperature': 60, 'stock_level': 5},
+    {'demand': '700', 'temperature': 40},
+    {},
+    {'demand': None, 'quantity': 1000},
+    {'demand': float('nan')},
+    {'demand': 'abc'},
+    [1, 2],
+    'x',
+]
+
+def outcome(call, row):
+    """A scoring call's result, or the type of exception it raised"""
+    try:
+        return call(row)
+    except Exception as e:
+        return type(e)
+
+async def score_concurrently(kind, rows):
+    with ThreadPoolExecutor(2) as executor:
+        service = ScoringService(max_batch=4, max_wait=0.01, executor=executor).start()
+        try:
+            async def score(row):
+                try:
+                    return await service.score(kind, row)
+                except Exception as e:
+                    return type(e)
+            results = await asyncio.gather(*(score(row) for row in rows))
+            return results, service.stats()[kind]
+        finally:
+            await service.stop()
+
+@pytest.mark.parametrize('kind, score_row', [
+    ('anomaly', anomaly_detection.detect_anomaly),
+    ('anomaly-fast', lambda row: anomaly_detection.detect_anomaly(row, mode='fast')),
+    ('risk', risk_forecasting.predict_risk),
+])
+def test_batched_results_match_single_row(trained, kind, score_row):
+    rows = ROWS * 3
+    expected = [outcome(score_row, row) for row in rows]
+    results, stats = asyncio.run(score_concurrently(kind, rows))
+    assert results == expected
+    assert stats['batches'] >= 1
+    assert stats['unbatched'] == 3 * sum(not batchable(row, anomaly_detection.FEATURES) for row in ROWS)
+
+def test_batchable():
+    features = anomaly_detection.FEATURES
+    assert batchable({'demand': 1, 'quantity': '2'}, features)
+    assert batchable({}, features)
+    assert not batchable({'demand': None}, features)
+    assert not batchable({'demand': float('inf')}, features)
+    assert not batchable({'demand': 'abc'}, features)
+    assert not batchable([1, 2], features)
@@ -0,0 +1,90 @@
+import os
+import json
+
+import pytest
+
+import model_registry
+from model_registry import ModelRegistry, ModelNotFoundError, new_version, publish_version, read_current_version
+
+ARTIFACT = 'ai-engine/models/params.json'
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    """A fresh registry over an empty ai-engine/models in a temporary directory"""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(model_registry.VERSIONS_DIR)
+    return ModelRegistry()
+
+def train(registry, value):
+    """Write ARTIFACT into a new staging version and publish it, as train_models.py does"""
+    version = new_version()
+    registry.staging = version
+    try:
+        path = registry.resolve(ARTIFACT)
+        with open(path + '.tmp', 'w') as f:
+            json.dump({'value': value}, f)
+        os.replace(path + '.tmp', path)
+    finally:
+        registry.staging = None
+    return version
+
+def test_paths_are_unversioned_before_first_publish(registry):
+    assert registry.resolve(ARTIFACT) == ARTIFACT
+    with pytest.raises(ModelNotFoundError):
+        registry.load(ARTIFACT)
+
+def test_staging_version_is_invisible_until_published(registry):
+    version = train(registry, 1)
+    with pytest.raises(ModelNotFoundError):
+        registry.load(ARTIFACT)
+    publish_version(version)
+    assert read_current_version() == version
+    assert registry.load(ARTIFACT) == {'value': 1}
+
+def test_new_version_is_seeded_from_current(registry):
+    first = train(registry, 1)
+    publish_version(first)
+    second = new_version()
+    seeded = os.path.join(model_registry.version_dir(second), 'params.json')
+    assert os.path.samefile(seeded, registry.resolve(ARTIFACT))
+
+def test_publish_reloads_changed_artifact(registry):
+    publish_version(train(registry, 1))
+    assert registry.load(ARTIFACT) == {'value': 1}
+    assert registry.load(ARTIFACT) == {'value': 1}
+    publish_version(train(registry, 2))
+    assert registry.load(ARTIFACT) == {'value': 2}
+    stats = registry.stats()[ARTIFACT]
+    assert (stats['loads'], stats['hits']) == (2, 1)
+
+def test_publish_prunes_older_versions_only(registry):
+    versions = [train(registry, i) for i in range(5)]
+    publish_version(versions[3])
+    remaining = sorted(os.listdir(model_registry.VERSIONS_DIR))
+    # KEEP_VERSIONS published ones up to the new one, plus the newer staging run
+    assert remaining == versions[4 - model_registry.KEEP_VERSIONS:]
+
+def test_watching_process_swaps_only_after_warming(registry):
+    publish_version(train(registry, 1))
+    registry.watch(interval=3600)
+    assert registry.load(ARTIFACT) == {'value': 1}
+
+    second = train(registry, 2)
+    publish_version(second)
+    # Requests stay on the active version until swap()
+    assert registry.load(ARTIFACT) == {'value': 1}
+
+    warmed = []
+    registry.swap(second, warm=lambda: warmed.append(registry.load(ARTIFACT)))
+    assert warmed == [{'value': 2}]
+    assert registry.load(ARTIFACT) == {'value': 2}
+    assert registry.last_swap['to'] == second
+
+def test_put_counts_as_a_cached_artifact(registry):
+    publish_version(train(registry, 1))
+    artifact = {'value': 'in memory'}
+    registry.put(ARTIFACT, artifact)
+    assert ARTIFACT in registry.stats()
+    assert registry.load(ARTIFACT) is artifact
+    assert registry.stats()[ARTIFACT]['loads'] == 0
+    assert registry.stats()[ARTIFACT]['hits'] == 1
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import IsolationForest, RandomForestClassifier, RandomForestRegressor
+
+from packed_forest import save_packed_forest, load_packed_forest
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.RandomState(0)
+    X = rng.normal(size=(400, 5))
+    X[:10] *= 6
+    y_reg = X[:, 0] * 2 + X[:, 1] ** 2 + rng.normal(scale=0.1, size=len(X))
+    y_cls = np.where(X[:, 0] + X[:, 2] > 0, 'high', 'low')
+    return X, y_reg, y_cls
+
+def packed(model, tmp_path):
+    path = str(tmp_path / 'model.packed')
+    save_packed_forest(model, path)
+    return load_packed_forest(path)
+
+def test_isolation_forest_matches_sklearn(data, tmp_path):
+    X = data[0]
+    model = IsolationForest(n_estimators=50, contamination=0.05, random_state=42).fit(X)
+    forest = packed(model, tmp_path)
+    np.testing.assert_array_equal(forest.score_samples(X), model.score_samples(X))
+    np.testing.assert_array_equal(forest.decision_function(X), model.decision_function(X))
+    np.testing.assert_array_equal(forest.predict(X), model.predict(X))
+
+def test_tree_prefix_matches_sklearn_subforest(data, tmp_path):
+    X = data[0]
+    model = IsolationForest(n_estimators=50, random_state=42).fit(X)
+    forest = packed(model, tmp_path)
+    subforest = IsolationForest(n_estimators=20, random_state=42).fit(X)
+    subforest.estimators_ = model.estimators_[:20]
+    subforest.estimators_features_ = model.estimators_features_[:20]
+    subforest._decision_path_lengths = model._decision_path_lengths[:20]
+    subforest._average_path_length_per_tree = model._average_path_length_per_tree[:20]
+    np.testing.assert_allclose(forest.with_trees(20).score_samples(X), subforest.score_samples(X),
+                               rtol=1e-12)
+
+def test_random_forest_regressor_matches_sklearn(data, tmp_path):
+    X, y_reg, _ = data
+    model = RandomForestRegressor(n_estimators=20, max_depth=8, random_state=0).fit(X, y_reg)
+    np.testing.assert_array_equal(packed(model, tmp_path).predict(X), model.predict(X))
+
+def test_random_forest_classifier_matches_sklearn(data, tmp_path):
+    X, _, y_cls = data
+    model = RandomForestClassifier(n_estimators=20, max_depth=6, random_state=0).fit(X, y_cls)
+    forest = packed(model, tmp_path)
+    np.testing.assert_array_equal(forest.predict_proba(X), model.predict_proba(X))
+    np.testing.assert_array_equal(forest.predict(X), model.predict(X))
+
+@pytest.mark.parametrize('bad', [np.nan, np.inf])
+def test_non_finite_features_raise(data, tmp_path, bad):
+    X = data[0][:5].copy()
+    X[2, 1] = bad
+    model = IsolationForest(n_estimators=10, random_state=42).fit(data[0])
+    # A NaN would otherwise silently take the right branch of every split
+    with pytest.raises(ValueError):
+        packed(model, tmp_path).score_samples(X)
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+import anomaly_detection
+import product_models
+import risk_forecasting
+from micro_batcher import batchable
+
+ROW = {'demand': 900, 'quantity': 400, 'delay_days': 6, 'temperature': 34, 'stock_level': 150}
+
+@pytest.fixture(scope='module')
+def shards(trained_root):
+    """Product shards for Rice only (Wheat and Corn have fewer than 20 rows)"""
+    previous = os.getcwd()
+    os.chdir(trained_root)
+    try:
+        return product_models.train_product_models(min_rows=20)
+    finally:
+        os.chdir(previous)
+
+def test_single_row_uses_product_shard(trained, shards):
+    row = dict(ROW, product='Rice')
+    batch = product_models.detect_anomalies_by_product([row])[0]
+    assert batch.pop('model') == 'Rice'
+    assert anomaly_detection.detect_anomaly(row) == batch
+
+def test_product_without_shard_uses_global_model(trained, shards):
+    assert 'Wheat' not in shards
+    assert anomaly_detection.detect_anomaly(dict(ROW, product='Wheat')) == anomaly_detection.detect_anomaly(ROW)
+    assert risk_forecasting.predict_risk(dict(ROW, product='Wheat')) == risk_forecasting.predict_risk(ROW)
+
+def test_single_row_risk_uses_product_shard(trained, shards):
+    if not shards['Rice']['risk']:
+        pytest.skip("Rice risk labels have a single class")
+    row = dict(ROW, product='Rice')
+    batch = product_models.predict_risk_by_product([row])
+    assert batch['model'] == ['Rice']
+    assert risk_forecasting.predict_risk(row)['risk_probability'] == pytest.approx(
+        batch['risk_probability'][0], abs=1e-9)
+
+def test_rows_with_a_shard_are_not_batched(trained, shards):
+    assert not batchable(dict(ROW, product='Rice'), anomaly_detection.FEATURES, 'anomaly')
+    assert batchable(dict(ROW, product='Wheat'), anomaly_detection.FEATURES, 'anomaly')
+    assert batchable(dict(ROW, product='Rice'), anomaly_detection.FEATURES)
+
+def test_by_product_rejects_non_finite_features(trained, shards):
+    with pytest.raises(ValueError):
+        product_models.detect_anomalies_by_product([dict(ROW, product='Rice', demand=float('inf'))])
+
+def test_empty_input(trained, shards):
+    assert product_models.detect_anomalies_by_product([]) == []
+    assert product_models.predict_risk_by_product([])['risk_probability'] == []
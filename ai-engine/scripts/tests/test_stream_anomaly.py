@@ -0,0 +1,48 @@
+import io
+import json
+
+import numpy as np
+import pytest
+
+from stream_anomaly import RunningStats, StreamingAnomalyDetector, run_stream
+
+def test_running_stats_match_numpy():
+    values = np.random.RandomState(2).normal(loc=1e6, scale=3.0, size=5000)
+    stats = RunningStats()
+    for value in values:
+        stats.update(float(value))
+    assert stats.count == len(values)
+    assert stats.mean == pytest.approx(np.mean(values), rel=1e-12)
+    assert stats.std == pytest.approx(np.std(values, ddof=1), rel=1e-9)
+
+def test_single_value_has_zero_variance():
+    stats = RunningStats()
+    stats.update(4.0)
+    assert stats.variance == 0.0
+
+@pytest.mark.parametrize('reading', [[1, 2], "x", 3])
+def test_non_object_reading_raises(reading):
+    with pytest.raises(TypeError):
+        StreamingAnomalyDetector().process(reading)
+
+@pytest.mark.parametrize('value', [float('nan'), float('inf')])
+def test_non_finite_reading_leaves_statistics_untouched(value):
+    detector = StreamingAnomalyDetector(warmup=2)
+    for temperature in (20.0, 21.0, 22.0):
+        detector.process({'product': 'Rice', 'temperature': temperature})
+    with pytest.raises(ValueError):
+        detector.process({'product': 'Rice', 'temperature': value})
+    stats = detector.stats['Rice']
+    assert (stats.count, stats.mean, stats.std) == (3, 21.0, 1.0)
+
+def test_run_stream_skips_invalid_lines():
+    lines = [json.dumps({'product': 'Rice', 'temperature': 20.0 + i % 3}) for i in range(12)]
+    lines += ['[1, 2]', '{"product": "Rice", "temperature": NaN}',
+              json.dumps({'product': 'Rice', 'temperature': 90.0})]
+    detector = StreamingAnomalyDetector(warmup=10)
+    out = io.StringIO()
+    run_stream(io.StringIO("\n".join(lines) + "\n"), out, detector)
+    flagged = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert len(flagged) == 1
+    assert flagged[0]['value'] == 90.0
+    assert detector.stats['Rice'].count == 13
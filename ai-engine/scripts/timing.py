@@ -0,0 +1,170 @@
+"""
+Stage Timing
+Lightweight span instrumentation for the ai-engine scripts, exported as a
+per-request timing block or as a Prometheus text-format file
+
+Disabled unless AI_TIMING is set; while disabled span() returns a shared
+no-op context manager and nothing is recorded. AI_TIMING_PROM=<path> additionally
+writes aggregated histograms for a node_exporter textfile collector.
+
+    with timing.span('forecast.arima'):
+        ...
+"""
+
+import os
+import time
+import atexit
+import threading
+import contextvars
+
+ENABLED = os.environ.get('AI_TIMING', '').lower() not in ('', '0', 'false', 'no')
+PROMETHEUS_PATH = os.environ.get('AI_TIMING_PROM')
+PROMETHEUS_INTERVAL = 10.0
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = contextvars.ContextVar('ai_timing_request', default=None)
+_lock = threading.Lock()
+_stages = {}
+_last_export = 0.0
+
+class _NullSpan:
+    """Shared do-nothing context manager used while timing is disabled"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.name, time.perf_counter() - self.start, self.start)
+        return False
+
+class RequestTiming:
+    """Spans recorded while handling one request, in completion order"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.end = None
+        self.spans = []
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.end = time.perf_counter()
+        _current.reset(self._token)
+        return False
+
+    def block(self):
+        """JSON-ready timing block: total and per-stage milliseconds"""
+        end = self.end if self.end is not None else time.perf_counter()
+        return {
+            'total_ms': round((end - self.start) * 1000, 3),
+            'stages': [
+                {'stage': name, 'start_ms': round((start - self.start) * 1000, 3), 'ms': round(seconds * 1000, 3)}
+                for name, start, seconds in self.spans
+            ]
+        }
+
+def span(name):
+    """Context manager timing one stage (a shared no-op when disabled)"""
+    return _Span(name) if ENABLED else _NULL_SPAN
+
+def collect():
+    """
+    Collect the spans of the current request
+
+    Returns a context manager whose value is a RequestTiming, or None when
+    timing is disabled. Spans in threads started through submit() are included.
+    """
+    return RequestTiming() if ENABLED else _NULL_SPAN
+
+def record(name, seconds, start=None):
+    """Add one stage measurement to the aggregates and the current request"""
+    request = _current.get()
+    if request is not None:
+        request.spans.append((name, start if start is not None else time.perf_counter() - seconds, seconds))
+    with _lock:
+        stage = _stages.get(name)
+        if stage is None:
+            stage = _stages[name] = {'count': 0, 'sum': 0.0, 'buckets': [0] * len(BUCKETS)}
+        stage['count'] += 1
+        stage['sum'] += seconds
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                stage['buckets'][index] += 1
+                break
+
+def _timed_call(name, fn, args):
+    with span(name):
+        return fn(*args)
+
+def submit(pool, name, fn, *args):
+    """pool.submit(fn, *args), timed as stage name and attributed to the current request"""
+    if not ENABLED:
+        return pool.submit(fn, *args)
+    context = contextvars.copy_context()
+    return pool.submit(context.run, _timed_call, name, fn, args)
+
+def snapshot():
+    """Aggregated count, total seconds and bucket counts per stage"""
+    with _lock:
+        return {name: {'count': stage['count'], 'sum_seconds': stage['sum'], 'buckets': list(stage['buckets'])}
+                for name, stage in _stages.items()}
+
+def prometheus_text():
+    """Aggregates in Prometheus text exposition format (cumulative buckets)"""
+    lines = [
+        '# HELP ai_engine_stage_seconds Time spent in each ai-engine stage',
+        '# TYPE ai_engine_stage_seconds histogram'
+    ]
+    for name, stage in sorted(snapshot().items()):
+        label = name.replace('\\', '\\\\').replace('"', '\\"')
+        cumulative = 0
+        for bound, count in zip(BUCKETS, stage['buckets']):
+            cumulative += count
+            lines.append(f'ai_engine_stage_seconds_bucket{{stage="{label}",le="{bound}"}} {cumulative}')
+        lines.append(f'ai_engine_stage_seconds_bucket{{stage="{label}",le="+Inf"}} {stage["count"]}')
+        lines.append(f'ai_engine_stage_seconds_sum{{stage="{label}"}} {stage["sum_seconds"]:.9f}')
+        lines.append(f'ai_engine_stage_seconds_count{{stage="{label}"}} {stage["count"]}')
+    return "\n".join(lines) + "\n"
+
+def write_prometheus(path=None):
+    """Write the aggregates atomically so a scraper never reads a partial file"""
+    path = path or PROMETHEUS_PATH
+    if not path:
+        return
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
+
+def maybe_write_prometheus():
+    """Export at most once per PROMETHEUS_INTERVAL seconds (for long-lived servers)"""
+    global _last_export
+    if not (ENABLED and PROMETHEUS_PATH):
+        return
+    now = time.monotonic()
+    if now - _last_export >= PROMETHEUS_INTERVAL:
+        _last_export = now
+        write_prometheus()
+
+if ENABLED and PROMETHEUS_PATH:
+    atexit.register(write_prometheus)
@@ -0,0 +1,128 @@
+const { spawn } = require('child_process');
+const readline = require('readline');
+
+const SERVER_SCRIPT = 'ai-engine/scripts/ai_server.py';
+const DEFAULT_WORKERS = 4;
+const REQUEST_TIMEOUT_MS = 60000;
+
+class AIEngineService {
+  constructor() {
+    this.process = null;
+    this.pending = new Map();
+    this.nextId = 1;
+  }
+
+  start() {
+    if (this.process) {
+      return this.process;
+    }
+
+    const args = [
+      SERVER_SCRIPT,
+      '--workers',
+      (process.env.AI_ENGINE_WORKERS || DEFAULT_WORKERS).toString()
+    ];
+    // Micro-batch concurrent single-row anomaly/risk requests (milliseconds)
+    if (process.env.AI_ENGINE_BATCH_WINDOW_MS) {
+      args.push('--batch-window-ms', process.env.AI_ENGINE_BATCH_WINDOW_MS);
+    }
+
+    const python = spawn('python', args);
+
+    readline.createInterface({ input: python.stdout }).on('line', (line) => {
+      this.handleLine(line);
+    });
+
+    python.stderr.on('data', (data) => {
+      console.error('AI engine:', data.toString().trim());
+    });
+
+    // Writing to an engine that has died fails here (EPIPE) rather than in write()
+    python.stdin.on('error', (error) => {
+      console.error('AI engine input closed:', error.message);
+      this.handleExit(python);
+      python.kill();
+    });
+
+    python.on('error', (error) => {
+      console.error('AI engine failed to start:', error);
+      this.handleExit(python);
+    });
+
+    python.on('close', (code) => {
+      if (code !== 0) {
+        console.error(`AI engine exited with code ${code}`);
+      }
+      this.handleExit(python);
+    });
+
+    this.process = python;
+    return python;
+  }
+
+  handleLine(line) {
+    let response;
+    try {
+      response = JSON.parse(line);
+    } catch (error) {
+      console.error('Invalid response from AI engine:', line);
+      return;
+    }
+
+    const request = this.pending.get(response.id);
+    if (!request) {
+      return;
+    }
+
+    this.pending.delete(response.id);
+    clearTimeout(request.timer);
+
+    if (response.error) {
+      request.reject(new Error(response.error));
+    } else {
+      // With AI_TIMING set the engine reports per-stage timings; pass them
+      // through on object results so routes return them with the payload
+      const result = response.result;
+      if (response.timing && result && typeof result === 'object' && !Array.isArray(result)) {
+        result.timing = response.timing;
+      }
+      request.resolve(result);
+    }
+  }
+
+  handleExit(python) {
+    // A stopped engine may report more than once, or after a new one started
+    if (this.process !== python) {
+      return;
+    }
+    this.process = null;
+    for (const request of this.pending.values()) {
+      clearTimeout(request.timer);
+      request.reject(new Error('AI engine stopped before answering'));
+    }
+    this.pending.clear();
+  }
+
+  request(action, params = {}) {
+    const python = this.start();
+    const id = this.nextId++;
+
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => {
+        this.pending.delete(id);
+        reject(new Error(`AI engine timed out on ${action}`));
+      }, REQUEST_TIMEOUT_MS);
+
+      this.pending.set(id, { resolve, reject, timer });
+      python.stdin.write(JSON.stringify({ id, action, params }) + '\n');
+    });
+  }
+
+  stop() {
+    if (this.process) {
+      this.process.stdin.end();
+    }
+  }
+}
+
+module.exports = new AIEngineService();